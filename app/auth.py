@@ -1,56 +1,208 @@
-from functools import lru_cache
-from typing import Any, Dict
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import jwt
-import requests
+from cachetools import TLRUCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from .config import get_settings
+from .http_client import get_http_client
 
 security = HTTPBearer()
 _settings = get_settings()
 
+_JWKS_TTL_SECONDS = 300
+# Start a background refresh this long before the cached JWKS expires.
+_JWKS_REFRESH_AHEAD_SECONDS = 30
+# Minimum age of the cached JWKS before an unknown `kid` may force a re-fetch,
+# and minimum wait after a failed fetch before trying again.
+_JWKS_MIN_REFRESH_INTERVAL = 30
 
-@lru_cache
-def _jwks() -> Dict[str, Any]:
-    url = f"{_settings.SUPABASE_URL}/auth/v1/keys"
-    resp = requests.get(url, timeout=5)
-    resp.raise_for_status()
-    return resp.json()
+_TOKEN_CACHE_SIZE = 10_000
+_TOKEN_CACHE_TTL_SECONDS = 300
 
+# Settings are fixed for the process lifetime; bind the hot-path values once.
+_AUD = getattr(_settings, "SUPABASE_JWT_AUD", None) or None
+_LOCAL_SECRET = _settings.local_jwt_secret
+_LOCAL_ALG = _settings.local_jwt_algorithm
+_JWKS_URL = f"{_settings.SUPABASE_URL}/auth/v1/keys"
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    token = credentials.credentials
 
-    # Try Supabase JWKS (RS256)
-    try:
-        jwks = _jwks()
-        unverified_header = jwt.get_unverified_header(token)
-        key = next(k for k in jwks["keys"] if k["kid"] == unverified_header.get("kid"))
-        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=["RS256"],
-            audience=_settings.SUPABASE_JWT_AUD if getattr(_settings, "SUPABASE_JWT_AUD", None) else None,
-            options={"verify_exp": True},
-        )
-    except Exception:
-        # Fallback to local HS256 tokens if configured
-        if _settings.local_jwt_secret:
+class UnknownSigningKeyError(jwt.InvalidKeyError):
+    """The token's `kid` is not in the JWKS, even after a refresh."""
+
+
+def _build_keys_by_kid(jwks: Dict[str, Any]) -> Dict[str, Any]:
+    keys_by_kid: Dict[str, Any] = {}
+    for jwk in jwks.get("keys", []):
+        kid = jwk.get("kid")
+        if not kid or jwk.get("kty") != "RSA":
+            continue
+        try:
+            keys_by_kid[kid] = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+        except Exception:
+            logging.exception("Skipping unusable JWK %s", kid)
+    return keys_by_kid
+
+
+class JwksCache:
+    """TTL-bound cache of the Supabase JWKS document.
+
+    Fetches run on the event loop through the shared httpx client and are
+    serialized by a single lock, so concurrent requests share one refresh.
+    Keys are refreshed in the background shortly before they expire, and a
+    failed refresh keeps serving the previous keys. Public key objects are
+    built once per fetch and looked up by `kid`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = _JWKS_TTL_SECONDS,
+        refresh_ahead: float = _JWKS_REFRESH_AHEAD_SECONDS,
+        on_rotate: Optional[Callable[[], None]] = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.on_rotate = on_rotate
+        self.keys: Optional[Dict[str, Any]] = None
+        self.keys_by_kid: Dict[str, Any] = {}
+        self.fetched_at = 0.0
+        self.lock = asyncio.Lock()
+        self._last_failure = float("-inf")
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    async def get(self) -> Dict[str, Any]:
+        """Return the public keys by `kid`, fetching or refreshing as needed."""
+        if self.keys is None or self._age() > self.ttl:
+            return await self.refresh(min_age=self.ttl - self.refresh_ahead)
+        if self._age() > self.ttl - self.refresh_ahead and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+        return self.keys_by_kid
+
+    async def refresh(self, min_age: float = 0.0) -> Dict[str, Any]:
+        """Re-fetch the JWKS unless the cached copy is younger than `min_age` seconds."""
+        async with self.lock:
+            # Another waiter may have refreshed while this one was queued on the lock.
+            if self.keys is not None and self._age() < min_age:
+                return self.keys_by_kid
+            # After a failed fetch, don't hammer an unreachable endpoint on every
+            # request: serve the stale keys (if any) until the interval passes.
+            if time.monotonic() - self._last_failure < _JWKS_MIN_REFRESH_INTERVAL:
+                if self.keys is None:
+                    raise RuntimeError("JWKS unavailable")
+                return self.keys_by_kid
             try:
-                payload = jwt.decode(
-                    token,
-                    _settings.local_jwt_secret,
-                    algorithms=[_settings.local_jwt_algorithm],
-                    options={"verify_exp": True},
-                )
+                resp = await get_http_client().get(self.url, timeout=5)
+                resp.raise_for_status()
+                keys = resp.json()
             except Exception:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication")
-        else:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication")
+                self._last_failure = time.monotonic()
+                if self.keys is None:
+                    raise
+                logging.exception("JWKS refresh failed; serving cached keys")
+                return self.keys_by_kid
+            if self.keys is not None and keys != self.keys and self.on_rotate:
+                self.on_rotate()
+            self.keys = keys
+            self.keys_by_kid = _build_keys_by_kid(keys)
+            self.fetched_at = time.monotonic()
+            return self.keys_by_kid
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh(min_age=self.ttl - self.refresh_ahead)
+        except Exception:
+            logging.exception("Background JWKS refresh failed")
+
+
+def _token_ttu(_key: bytes, value: Tuple[Dict[str, Any], Optional[float]], now: float) -> float:
+    # Entries never outlive the token itself; `now` is on the cache's monotonic clock.
+    _payload, exp = value
+    remaining = _TOKEN_CACHE_TTL_SECONDS if exp is None else exp - time.time()
+    return now + min(remaining, _TOKEN_CACHE_TTL_SECONDS)
+
+
+# Validated payloads keyed by a hash of the bearer token, so repeat requests
+# skip signature verification. Lookups and inserts never await, so the cache
+# is only touched from the event loop between suspension points and needs no lock.
+_token_cache: TLRUCache = TLRUCache(maxsize=_TOKEN_CACHE_SIZE, ttu=_token_ttu)
+
+jwks_cache = JwksCache(_JWKS_URL, on_rotate=_token_cache.clear)
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _cached_payload(key: bytes) -> Optional[Dict[str, Any]]:
+    cached = _token_cache.get(key)
+    if cached is None:
+        return None
+    payload, exp = cached
+    if exp is not None and exp <= time.time():
+        return None
+    return payload
+
+
+async def _decode_supabase_token(token: str) -> Dict[str, Any]:
+    unverified_header = jwt.get_unverified_header(token)
+    if unverified_header.get("alg") != "RS256":
+        raise jwt.InvalidAlgorithmError("Not an RS256 token")
+
+    kid = unverified_header.get("kid")
+    public_key = (await jwks_cache.get()).get(kid)
+    if public_key is None:
+        # Keys may have rotated since the last fetch; re-fetch at most once per interval.
+        public_key = (await jwks_cache.refresh(min_age=_JWKS_MIN_REFRESH_INTERVAL)).get(kid)
+    if public_key is None:
+        raise UnknownSigningKeyError(f"Unknown signing key: {kid}")
+
+    return jwt.decode(
+        token,
+        public_key,
+        algorithms=["RS256"],
+        audience=_AUD,
+        options={"verify_exp": True},
+    )
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    token = credentials.credentials
+    cache_key = _token_key(token)
+    payload = _cached_payload(cache_key)
+
+    if payload is None:
+        # Try Supabase JWKS (RS256)
+        try:
+            payload = await _decode_supabase_token(token)
+        except Exception as exc:
+            # Surface key-rotation misses distinctly so clients know to re-authenticate.
+            detail = "Unknown signing key" if isinstance(exc, UnknownSigningKeyError) else "Invalid authentication"
+            # Fallback to local HS256 tokens if configured
+            if _LOCAL_SECRET:
+                try:
+                    payload = jwt.decode(
+                        token,
+                        _LOCAL_SECRET,
+                        algorithms=[_LOCAL_ALG],
+                        options={"verify_exp": True},
+                    )
+                except Exception:
+                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+            else:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+        exp = payload.get("exp")
+        _token_cache[cache_key] = (payload, float(exp) if isinstance(exp, (int, float)) else None)
 
     user_id = payload.get("sub") or payload.get("user_id") or payload.get("id")
     if not user_id:
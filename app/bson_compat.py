@@ -5,25 +5,42 @@ package layout differs (some environments install a namespace package
 without __init__.py). Import this module instead of importing directly
 from `bson` to avoid ImportError at runtime.
 """
+import logging
 from collections import OrderedDict
+from typing import Final
 
 try:
     # Preferred: pymongo's bundled bson
-    from bson import ObjectId, SON  # type: ignore
+    from bson import ObjectId as _ObjectId, SON as _SON  # type: ignore
 except Exception:
     try:
         # Try explicit submodules
-        from bson.objectid import ObjectId  # type: ignore
+        from bson.objectid import ObjectId as _ObjectId  # type: ignore
     except Exception:
         try:
             # Last resort: pymongo internals
-            from pymongo.objectid import ObjectId  # type: ignore
+            from pymongo.objectid import ObjectId as _ObjectId  # type: ignore
         except Exception as exc:  # pragma: no cover
             raise ImportError("ObjectId not available from bson or pymongo") from exc
 
     try:
-        from bson.son import SON  # type: ignore
+        from bson.son import SON as _SON  # type: ignore
     except Exception:
-        SON = OrderedDict
+        _SON = OrderedDict
+
+try:
+    from bson import has_c as _has_c  # type: ignore
+except Exception:  # pragma: no cover
+    def _has_c() -> bool:
+        return False
+
+# The pure-Python bson fallback is several times slower at (de)serializing
+# documents; surface it at startup rather than in request latency.
+if not _has_c():  # pragma: no cover
+    logging.warning("bson C extension not loaded; falling back to pure-Python BSON")
+
+# Bound once so every `from .bson_compat import ObjectId` shares the same class object.
+ObjectId: Final = _ObjectId
+SON: Final = _SON
 
 __all__ = ["ObjectId", "SON"]
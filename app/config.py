@@ -6,16 +6,52 @@ load_dotenv()
 class Settings:
     MONGO_URI = os.getenv("MONGO_URI")
     MONGO_DB = os.getenv("MONGO_DB", "brsr_demo")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "200"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+    # zstd needs the `zstandard` package; unavailable compressors are skipped by pymongo.
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000"))
 
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "pdfs")
+    # Max concurrent storage uploads per worker process.
+    STORAGE_MAX_CONCURRENCY = int(os.getenv("STORAGE_MAX_CONCURRENCY", "16"))
+    # Size of the event loop's default executor (asyncio.to_thread: file
+    # spooling, Excel exports, semantic-cache embeddings).
+    THREAD_POOL_WORKERS = int(os.getenv("THREAD_POOL_WORKERS", "32"))
 
     # JWT verification settings (used when validating Supabase tokens)
     SUPABASE_JWT_AUD = os.getenv("SUPABASE_JWT_AUD", "authenticated")
     SUPABASE_JWT_ISSUER = os.getenv("SUPABASE_JWT_ISSUER", "")
 
+    # Comma-separated list of allowed browser origins; "*" allows any origin.
+    CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
+
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    # Max Gemini extractions in flight per worker process.
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    # Serve the static Section A prompt from a Gemini context cache.
+    GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+    GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+
+    # Redis for the extraction task queue (app/services/processing.py). When
+    # unset, extractions run as background tasks in the web process.
+    REDIS_URL = os.getenv("REDIS_URL")
+    EXTRACTION_JOB_TIMEOUT_SECONDS = int(os.getenv("EXTRACTION_JOB_TIMEOUT_SECONDS", "600"))
+
+    # Near-duplicate extraction cache (see app/services/semantic_cache.py); off by default.
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_PAGES = int(os.getenv("SEMANTIC_CACHE_PAGES", "3"))
+    SEMANTIC_CACHE_FINGERPRINT_CHARS = int(os.getenv("SEMANTIC_CACHE_FINGERPRINT_CHARS", "8192"))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+    # Upload limits: per PDF, and per request (checked against Content-Length).
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+    MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_MB", "200")) * 1024 * 1024
+
     # Local JWT settings for demo auth (optional). If not provided, local auth is disabled.
     local_jwt_secret: str = os.getenv("LOCAL_JWT_SECRET", "")
     local_jwt_algorithm: str = os.getenv("LOCAL_JWT_ALGORITHM", "HS256")
@@ -1,6 +1,8 @@
+import logging
 from typing import Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 
 from .config import settings
 
@@ -17,10 +19,24 @@ def get_client() -> AsyncIOMotorClient:
 	if _client is None:
 		if not settings.MONGO_URI:
 			raise RuntimeError("MONGO_URI not configured in environment")
-		_client = AsyncIOMotorClient(settings.MONGO_URI)
+		_client = AsyncIOMotorClient(
+			settings.MONGO_URI,
+			maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+			minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+			compressors=settings.MONGO_COMPRESSORS,
+			serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+			retryWrites=True,
+		)
 	return _client
 
 
+def close_client() -> None:
+	global _client
+	if _client is not None:
+		_client.close()
+		_client = None
+
+
 def get_db():
 	client = get_client()
 	return client[settings.MONGO_DB]
@@ -29,4 +45,36 @@ def get_db():
 # Convenience: collection accessor used across the app. Importing this module
 # will NOT create a client until `get_client()` or `get_db()` is called.
 def documents_collection():
-	return get_db()["documents"]
\ No newline at end of file
+	return get_db()["documents"]
+
+
+async def ensure_indexes() -> None:
+	"""Create the indexes backing the document queries (idempotent)."""
+	# Serves per-user listing ({user_id}), status filters and the Excel export's
+	# {user_id, status, _id $in} lookup; supersedes a plain {user_id, status} index.
+	await documents_collection().create_index([("user_id", 1), ("status", 1), ("_id", 1)])
+	# Content-hash lookups that reuse completed extractions for identical PDFs.
+	await documents_collection().create_index([("file_hash", 1), ("status", 1)])
+	# One document per (user, file name): the race-safe backstop for upload
+	# dedupe, and a covering index for the batched file_name $in check.
+	try:
+		await documents_collection().create_index([("user_id", 1), ("file_name", 1)], unique=True)
+	except OperationFailure:
+		# Existing duplicates block the build; uploads still dedupe via the
+		# pre-insert check, just without the race protection.
+		logging.exception("Could not create unique {user_id, file_name} index")
+	# Login lookups, and the duplicate-signup check in users_service.create_user.
+	try:
+		await get_db()["users"].create_index("email", unique=True)
+	except OperationFailure:
+		logging.exception("Could not create unique users.email index")
+
+
+async def init_db() -> None:
+	"""Open the connection pool eagerly and make sure indexes exist.
+
+	Called from the app lifespan so the first request doesn't pay for
+	server discovery and connection setup.
+	"""
+	await get_client().admin.command("ping")
+	await ensure_indexes()
\ No newline at end of file
@@ -0,0 +1,31 @@
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Lazily create and return the shared async HTTP client.
+
+    The client is normally opened in the application lifespan and closed on
+    shutdown; creating it on first use keeps scripts and workers working
+    without the FastAPI app.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        # HTTP/2 lets concurrent Storage transfers share a few multiplexed
+        # TLS connections instead of opening one per in-flight request.
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=10,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
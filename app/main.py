@@ -1,13 +1,89 @@
-from fastapi import FastAPI
+import asyncio
+import importlib.util
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from .auth import jwks_cache
+from .config import settings
+from .database import close_client, init_db
+from .http_client import close_http_client, get_http_client
 from .routes import upload, documents, excel, auth
+from .routes.upload import PROMPT as SECTION_A_PROMPT
+from .services.gemini_service import get_gemini_service
+from .services.processing import close_queue
+from .services.users_service import warm_password_hashing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# Warm shared clients once per worker so the first request doesn't pay for
+	# connection setup; failures are logged and retried lazily on first use.
+	cache_task = None
+	asyncio.get_running_loop().set_default_executor(
+		ThreadPoolExecutor(max_workers=settings.THREAD_POOL_WORKERS, thread_name_prefix="io")
+	)
+	get_http_client()
+	try:
+		await init_db()
+	except Exception:
+		# Keep serving (e.g. /health) even if Mongo is unreachable at boot.
+		logging.exception("Failed to initialize MongoDB")
+	try:
+		await warm_password_hashing()
+	except Exception:
+		logging.exception("Failed to warm password hashing")
+	if settings.SUPABASE_URL:
+		try:
+			await jwks_cache.get()
+		except Exception:
+			logging.exception("Failed to prefetch JWKS")
+	try:
+		gemini = get_gemini_service()
+	except Exception:
+		logging.exception("Failed to initialize Gemini client")
+	else:
+		prompt_tokens = await gemini.count_prompt_tokens(SECTION_A_PROMPT)
+		if prompt_tokens is not None:
+			logging.info("Section A prompt: %d tokens", prompt_tokens)
+		if settings.GEMINI_CONTEXT_CACHE:
+			# Register the static prompt with Gemini and keep it from expiring.
+			cache_task = asyncio.create_task(gemini.keep_prompt_cache_warm(SECTION_A_PROMPT))
+	yield
+	if cache_task is not None:
+		cache_task.cancel()
+	close_client()
+	await close_http_client()
+	await close_queue()
+
+
+# orjson serializes the large extracted_json payloads much faster than stdlib json.
+app = FastAPI(title="BRSR PDF Parser Demo", lifespan=lifespan, default_response_class=ORJSONResponse)
+
 
-app = FastAPI(title="BRSR PDF Parser Demo")
+@app.middleware("http")
+async def limit_request_body(request: Request, call_next):
+	# Reject oversized uploads before the multipart body is parsed and spooled.
+	content_length = request.headers.get("content-length")
+	if content_length and content_length.isdigit() and int(content_length) > settings.MAX_REQUEST_BYTES:
+		return ORJSONResponse(status_code=413, content={"detail": "Request body too large"})
+	return await call_next(request)
 
-# CORS - allow all origins for frontend development
+
+# Compress large JSON payloads (extracted_json) on the wire.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# CORS - origins come from CORS_ORIGINS (defaults to "*" for frontend
+# development). Added last so it is the outermost middleware and also
+# decorates early error responses.
 app.add_middleware(
 	CORSMiddleware,
-	allow_origins=["*"],
+	allow_origins=settings.CORS_ORIGINS,
 	allow_credentials=True,
 	allow_methods=["*"],
 	allow_headers=["*"],
@@ -21,4 +97,22 @@ app.include_router(auth, prefix="/auth", tags=["Auth"])
 
 @app.get("/health", tags=["health"])
 async def health_check():
-	return {"status": "ok"}
\ No newline at end of file
+	return {"status": "ok"}
+
+
+if __name__ == "__main__":
+	# Production-style launch: `python -m app.main`. uvloop and httptools are
+	# drop-in faster implementations of the event loop and HTTP parser;
+	# uvloop is not available on Windows, so fall back to asyncio there.
+	import uvicorn
+
+	uvicorn.run(
+		"app.main:app",
+		host=os.getenv("HOST", "0.0.0.0"),
+		port=int(os.getenv("PORT", "8000")),
+		loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+		http="httptools",
+		workers=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+		limit_concurrency=1000,
+		timeout_keep_alive=30,
+	)
\ No newline at end of file
@@ -1,23 +1,42 @@
-from datetime import datetime
-from typing import Any, List, Optional
+import re
+from datetime import datetime, timezone
+from typing import Any, List, Literal, Optional, Union
 
 from .bson_compat import ObjectId
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from pydantic_core import core_schema
+
+_OID_RE = re.compile(r"^[0-9a-fA-F]{24}$")
+
+
+def _validate_object_ids(ids: List[str]) -> List[str]:
+    bad = [i for i in ids if not _OID_RE.match(i)]
+    if bad:
+        raise ValueError(f"invalid document ids: {bad}")
+    # Callers match these against str(ObjectId), which is always lowercase.
+    return [i.lower() for i in ids]
 
 
 class PyObjectId(ObjectId):
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, _source_type, _handler):
+        # Built once per model class; validation is a direct call to `validate`.
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(str),
+        )
 
     @classmethod
     def validate(cls, v):  # type: ignore[override]
         if isinstance(v, ObjectId):
             return v
-        try:
-            return ObjectId(str(v))
-        except Exception as exc:  # noqa: BLE001
-            raise ValueError("Not a valid ObjectId") from exc
+        # ObjectId parses 24-char hex strings and 12-byte values natively.
+        if isinstance(v, (str, bytes)):
+            try:
+                return ObjectId(v)
+            except Exception as exc:  # noqa: BLE001
+                raise ValueError("Not a valid ObjectId") from exc
+        raise ValueError("Not a valid ObjectId")
 
 
 class DocumentStatus:
@@ -33,7 +52,7 @@ class DocumentCreate(BaseModel):
     status: str = DocumentStatus.PROCESSING
     extracted_json: dict[str, Any] = Field(default_factory=dict)
     error_message: str = ""
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     parsed_at: Optional[datetime] = None
 
 
@@ -66,6 +85,192 @@ class DocumentDetail(BaseModel):
 class ExcelRequest(BaseModel):
     document_ids: List[str]
 
+    check_document_ids = field_validator("document_ids")(_validate_object_ids)
+
 
 class DocumentStatusRequest(BaseModel):
-    document_ids: List[str]
\ No newline at end of file
+    document_ids: List[str]
+
+    check_document_ids = field_validator("document_ids")(_validate_object_ids)
+
+
+# =========================
+# SECTION A EXTRACTION SCHEMA
+# =========================
+# Passed to Gemini as `response_schema`, so it is the single definition of the
+# extracted JSON's keys and nesting. Numeric fields also accept strings so
+# values can be kept exactly as written ("1,234.50", "N/A").
+
+ExtractedNumber = Optional[Union[float, str]]
+
+SECTORS = (
+    "Agriculture", "Auto ancillary", "Aviation", "Building materials", "Chemicals",
+    "Consumer durables", "Dairy products", "Defence", "Diversified", "Education & training",
+    "Energy", "Engineering & capital goods", "FMCG", "Fertilizers", "Financial services",
+    "Healthcare", "IT", "Logistics", "Media & entertainment", "Metals", "Miscellaneous",
+    "NBFC", "Packaging", "Plastic pipes", "Real estate", "Retail", "Services", "Silver",
+    "Software services", "Solar panel", "Telecom", "Textiles", "Tourism & hospitality",
+    "Trading",
+)
+
+
+class EntityDetails(BaseModel):
+    cin: str
+    name: str
+    year_of_incorporation: ExtractedNumber
+    registered_office_address: str
+    corporate_office_address: str
+    email: str
+    telephone: str
+    website: str
+    financial_year: str
+    stock_exchange_listing: str = Field(
+        description="Every stock exchange the entity is listed on, as written, separated by semicolons"
+    )
+    paid_up_capital: ExtractedNumber
+    contact_person_details: str = Field(description="Name and contact details of the BRSR contact person")
+    reporting_boundary: str
+    assurance_provider: str
+    assurance_type: str
+    sector: Literal[SECTORS] = Field(description="Closest sector for the business activity and products")
+
+
+class BusinessActivity(BaseModel):
+    main_activity_description: str = Field(description="Description of main business activity")
+    description: str = Field(description="Description of business activity")
+    percent_of_turnover: ExtractedNumber
+
+
+class ProductService(BaseModel):
+    product_service: str
+    nic_code: str
+    percent_of_total_turnover: ExtractedNumber
+
+
+class Locations(BaseModel):
+    national_plants: ExtractedNumber
+    national_offices: ExtractedNumber
+    international_plants: ExtractedNumber
+    international_offices: ExtractedNumber
+
+
+class MarketsServed(BaseModel):
+    international_countries: ExtractedNumber
+    export_percent: ExtractedNumber
+    customers_brief: str
+
+
+class EmployeeCounts(BaseModel):
+    total_permanent: ExtractedNumber
+    permanent_male: ExtractedNumber
+    permanent_female: ExtractedNumber
+    other_than_permanent: ExtractedNumber
+    other_than_permanent_male: ExtractedNumber
+    other_than_permanent_female: ExtractedNumber
+    total_employees: ExtractedNumber
+    total_male: ExtractedNumber
+    total_female: ExtractedNumber
+
+
+class WorkerCounts(BaseModel):
+    total_permanent: ExtractedNumber
+    permanent_male: ExtractedNumber
+    permanent_female: ExtractedNumber
+    other_than_permanent: ExtractedNumber
+    other_than_permanent_male: ExtractedNumber
+    other_than_permanent_female: ExtractedNumber
+    total_workers: ExtractedNumber
+    total_male: ExtractedNumber
+    total_female: ExtractedNumber
+
+
+class Headcount(BaseModel):
+    employees: EmployeeCounts
+    workers: WorkerCounts
+    differently_abled_employees: EmployeeCounts
+    differently_abled_workers: WorkerCounts
+
+
+class WomenRepresentation(BaseModel):
+    board_of_directors_total: ExtractedNumber
+    board_of_directors_women: ExtractedNumber
+    kmp_total: ExtractedNumber
+    kmp_women: ExtractedNumber
+
+
+class TurnoverSplit(BaseModel):
+    male: ExtractedNumber
+    female: ExtractedNumber
+    total: ExtractedNumber
+
+
+class TurnoverRate(BaseModel):
+    permanent_employees: TurnoverSplit
+    permanent_workers: TurnoverSplit
+
+
+class HoldingSubsidiary(BaseModel):
+    name: str
+    type: str = Field(description="Holding/Subsidiary/Associate/Joint Venture")
+    percent_shares_held: ExtractedNumber
+
+
+class Csr(BaseModel):
+    is_applicable: str
+    turnover_inr_cr: ExtractedNumber
+    net_worth_inr_cr: ExtractedNumber
+
+
+class StakeholderMechanism(BaseModel):
+    communities: str = Field(description="Yes/No")
+    investors_other_than_shareholders: str = Field(description="Yes/No")
+    shareholders: str = Field(description="Yes/No")
+    employees_and_workers: str = Field(description="Yes/No")
+    customers: str = Field(description="Yes/No")
+    value_chain_partners: str = Field(description="Yes/No")
+    other_please_specify: str = Field(description="Yes/No")
+
+
+class StakeholderComplaints(BaseModel):
+    communities: ExtractedNumber
+    investors_other_than_shareholders: ExtractedNumber
+    shareholders: ExtractedNumber
+    employees_and_workers: ExtractedNumber
+    customers: ExtractedNumber
+    value_chain_partners: ExtractedNumber
+    other_please_specify: ExtractedNumber
+
+
+class Grievances(BaseModel):
+    mechanism_in_place: StakeholderMechanism
+    filed: StakeholderComplaints
+    pending: StakeholderComplaints
+
+
+class MaterialIssue(BaseModel):
+    material_issue: str
+    risk_or_opportunity: str
+    rationale: str
+    financial_implications: str
+
+
+class MaterialRisksOpportunities(BaseModel):
+    environment: List[MaterialIssue]
+    social: List[MaterialIssue]
+    governance: List[MaterialIssue]
+
+
+class SectionAResponse(BaseModel):
+    section: str
+    entity_details: EntityDetails
+    business_activity: BusinessActivity
+    products_services: List[ProductService]
+    locations: Locations
+    markets_served: MarketsServed
+    employees: Headcount
+    women_representation: WomenRepresentation
+    turnover_rate: TurnoverRate
+    holding_subsidiaries: List[HoldingSubsidiary]
+    csr: Csr
+    grievances: Grievances
+    material_risks_opportunities: MaterialRisksOpportunities
\ No newline at end of file
@@ -12,28 +12,32 @@ router = APIRouter()
 @router.get("/")
 async def list_documents(user=Depends(get_current_user)):
     coll = documents_collection()
-    docs = coll.find({"user_id": user["sub"]})
+    # The extracted JSON is large and not part of the list view.
+    docs = await coll.find({"user_id": user["sub"]}, {"extracted_json": 0}).to_list(length=None)
 
-    results = []
-    async for d in docs:
-        d["id"] = str(d["_id"])
-        del d["_id"]
-        results.append(d)
-
-    return results
+    return [{**d, "id": str(d.pop("_id"))} for d in docs]
 
 
 @router.get("/{doc_id}")
 async def get_document(doc_id: str, user=Depends(get_current_user)):
     coll = documents_collection()
-    doc = await coll.find_one({
-        "_id": ObjectId(doc_id),
-        "user_id": user["sub"]
-    })
+    doc = await coll.find_one(
+        {"_id": ObjectId(doc_id), "user_id": user["sub"]},
+        {
+            "_id": 0,
+            "file_name": 1,
+            "file_url": 1,
+            "status": 1,
+            "extracted_json": 1,
+            "error_message": 1,
+            "created_at": 1,
+            "parsed_at": 1,
+        },
+    )
 
     if doc:
-        doc["id"] = str(doc["_id"])
-        del doc["_id"]
+        # The filter already pins _id, so reuse the caller's id instead of fetching it.
+        doc["id"] = doc_id
 
     return doc
 
@@ -48,25 +52,25 @@ async def documents_status(request: Optional[DocumentStatusRequest] = None, user
     Returns a list of objects: {id, status, error_message, parsed_at, file_url}.
     """
     coll = documents_collection()
+    projection = {"status": 1, "error_message": 1, "parsed_at": 1, "file_url": 1}
 
     # If a list of ids was provided, filter by them; otherwise return all for the user
     if request and getattr(request, "document_ids", None):
-        try:
-            ids = [ObjectId(i) for i in request.document_ids]
-        except Exception:
-            return {"error": "one or more invalid document ids"}
-        cursor = coll.find({"_id": {"$in": ids}, "user_id": user["sub"]})
+        # Ids are pre-validated by DocumentStatusRequest.
+        ids = [ObjectId(i) for i in request.document_ids]
+        cursor = coll.find({"_id": {"$in": ids}, "user_id": user["sub"]}, projection)
     else:
-        cursor = coll.find({"user_id": user["sub"]})
+        cursor = coll.find({"user_id": user["sub"]}, projection)
+
+    docs = await cursor.to_list(length=None)
 
-    out = []
-    async for d in cursor:
-        out.append({
+    return [
+        {
             "id": str(d["_id"]),
             "status": d.get("status"),
             "error_message": d.get("error_message"),
             "parsed_at": d.get("parsed_at"),
             "file_url": d.get("file_url"),
-        })
-
-    return out
\ No newline at end of file
+        }
+        for d in docs
+    ]
\ No newline at end of file
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from ..bson_compat import ObjectId
@@ -15,18 +17,17 @@ async def generate_excel(request: ExcelRequest, user=Depends(get_current_user)):
     if not request.document_ids:
         raise HTTPException(status_code=400, detail="document_ids is required")
 
-    try:
-        object_ids = [ObjectId(i) for i in request.document_ids]
-    except Exception:
-        raise HTTPException(status_code=400, detail="one or more invalid document_ids")
+    # Ids are pre-validated by ExcelRequest.
+    object_ids = [ObjectId(i) for i in request.document_ids]
 
     coll = documents_collection()
     docs = coll.find({
         "_id": {"$in": object_ids},
         "user_id": user["sub"],
         "status": "completed",
-        "extracted_json": {"$exists": True, "$ne": None},
-    })
+        # $ne: null also excludes documents where the field is missing.
+        "extracted_json": {"$ne": None},
+    }, {"extracted_json": 1})
 
     by_id = {}
     async for d in docs:
@@ -41,7 +42,8 @@ async def generate_excel(request: ExcelRequest, user=Depends(get_current_user)):
             detail="No completed documents found for the provided document_ids",
         )
 
-    excel_file = ExcelService.generate_excel(json_docs)
+    # Building the workbook is CPU-bound; keep it off the event loop.
+    excel_file = await asyncio.to_thread(ExcelService.generate_excel, json_docs)
 
     return StreamingResponse(
         excel_file,
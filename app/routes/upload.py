@@ -1,18 +1,32 @@
 from fastapi import APIRouter, UploadFile, Depends, HTTPException, File, BackgroundTasks
 from typing import List, Optional
 import asyncio
-from bson import ObjectId
-from datetime import datetime
+import contextlib
+import hashlib
+import os
+import tempfile
+from ..bson_compat import ObjectId
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timezone
 import logging
 
 from ..auth import get_current_user
 from ..database import documents_collection
-from ..services.storage_service import StorageService, DuplicateFileError
-from ..services.gemini_service import GeminiService
+from ..services.storage_service import StorageService, DuplicateFileError, upload_semaphore
+from ..services.gemini_service import GeminiService, get_gemini_service
+from ..services import semantic_cache
+from ..services.processing import enqueue_extraction
+from ..services.section_a import compute_confidence, normalize_section_a
 from ..config import settings
+from ..models import SectionAResponse
 
 router = APIRouter()
-gemini = GeminiService()
+# Caps concurrent Gemini calls across all requests so a large batch queues
+# here instead of tripping API rate limits.
+_gemini_sem = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+# Strong references to in-flight extraction tasks; the event loop only keeps
+# weak ones, so an unreferenced task can be garbage-collected mid-run.
+_background_tasks = set()
 
 # =========================
 # BRSR SECTION A PROMPT
@@ -20,6 +34,12 @@ gemini = GeminiService()
 
 GEMINI_API_KEY = settings.GEMINI_API_KEY  # or paste directly (not recommended)
 MODEL_NAME = "gemini-2.5-flash"  # fast + cheap, enough for extraction
+UPLOAD_CHUNK_SIZE = 1 << 20
+DUPLICATE_KEY_ERROR = 11000
+PDF_MAGIC = b"%PDF-"
+PDF_EOF = b"%%EOF"
+# How far from the end of the file the %%EOF marker may appear.
+PDF_TRAILER_WINDOW = 1024
 
 PROMPT = """
 You are a regulatory document extraction engine.
@@ -28,7 +48,7 @@ You are given a full PDF of a SEBI Business Responsibility and Sustainability Re
 
 Your task is to extract ONLY SECTION A – GENERAL DISCLOSURES.
 
-Extract ONLY the exact fields shown in the Annexure II template below.
+Extract ONLY the fields listed below; the response schema defines the exact JSON keys.
 Ignore everything else.
 
 DO NOT extract Section B or Section C.
@@ -57,49 +77,6 @@ DO NOT extract Section B or Section C.
 12. Output ONLY valid JSON.
 13. Do NOT leave string fields as empty strings "" unless the PDF explicitly shows it as blank.
 
----
-
-### ------------------------------------------
-### CONFIDENCE SCORE CALCULATION 
-### ------------------------------------------
-
-After extraction, calculate confidence_score (0-100) using the following logic:
-
-1. Total required fields in template = 103.
-2. Count as "field_with_value" if:
-   * Field has an actual extracted value.
-   * Field explicitly contains "N/A", "0", "Nil", or null because the PDF explicitly states it or clearly does not provide that data.
-3. Do NOT penalize fields that are:
-   * Not mentioned in the PDF at all.
-   * Clearly not applicable based on the document.
-4. Only reduce confidence if:
-   * A field should logically exist in Section A but extraction failed.
-   * The value was partially extracted or malformed.
-5. Formula:
-   confidence_score = (fields_correctly_extracted / total_fields) x 100
-6. Round to nearest integer.
-7. Assign this score to "confidence_score".
-
-Important:
-* Do NOT reduce confidence for legitimate null, N/A, or zero values.
-* Do NOT reduce confidence for optional subsections not present in the document.
-
----
-
-### ------------------------------------------
-### FIELD VALUE HANDLING SUMMARY
-### ------------------------------------------
-
-| PDF Value                     | Return                          |
-| ----------------------------- | ------------------------------- |
-| N/A / NA / Not Applicable     | "N/A"                           |
-| 0                             | 0                               |
-| Nil                           | 0 (numeric fields only)         |
-| Explicit blank field          | null (numeric) / "N/A" (string) |
-| Field not present in document | null (numeric) / "N/A" (string) |
-| Actual value found            | Exact extracted value           |
-| Not found at all              | "Not found in the pdf"          |
-
 ------------------------------------------
 FIELDS TO EXTRACT (ONLY THESE)
 ------------------------------------------
@@ -128,74 +105,9 @@ FIELDS TO EXTRACT (ONLY THESE)
     - 1 Jan 2022 to 31 Dec 2022
   → Return strictly in this format:
   "2022-23"
----
-
-### 10. Stock Exchange Listing (Normalized Output Required)
-
-Extract stock exchange listing information and normalize the output using the rules below:
-
-#### Normalization Rules:
-
-1. If any variation of BSE is found (including but not limited to):
-
-  * "BSE"
-  * "BSE Ltd"
-  * "BSE Limited"
-  * "Bombay Stock Exchange"
-  * "Bombay Stock Exchange Limited"
-
-  → Return exactly: "BSE"
-
-2. If any variation of NSE is found (including but not limited to):
-
-  * "NSE"
-  * "NSE Ltd"
-  * "NSE Limited"
-  * "National Stock Exchange"
-  * "National Stock Exchange of India Limited"
-
-  → Return exactly: "NSE"
-
-3. If both NSE and BSE are mentioned in any format:
-
-  → Return exactly: "BSE NSE"
-
-  (Always return in this order: BSE first, then NSE)
-
-4. If other stock exchanges are mentioned (e.g., international exchanges):
-
-  * Include them after BSE/NSE (if present)
-  * Separate values using a single space
-  * Preserve their original name as written (no reformatting)
-
-  Example:
-
-  * If listed on NSE and London Stock Exchange
-    → "NSE London Stock Exchange"
-
-  * If listed on BSE, NSE and NYSE
-    → "BSE NSE NYSE"
-
-5. If only other stock exchanges are mentioned (no NSE or BSE):
-
-  * Return them exactly as written, separated by a single space.
-
-6. If explicitly stated as not listed:
-
-  * Return "None"
-
-7. If the field is not mentioned in the document:
-
-  * Return "N/A"
-
-#### Output Type:
-
-* Must be a string.
-* Do NOT return arrays.
-* Do NOT return null.
-* Do NOT return empty string unless explicitly blank in PDF.
-
----
+10. Stock Exchange Listing
+  - Every exchange the entity is listed on, exactly as written, separated by semicolons
+  - "None" if explicitly stated as not listed; "N/A" if not mentioned
 11. Paid-up Capital
 12. Name and contact details of the person who may be contacted in case of any queries on the BRSR report
 13. Reporting boundary
@@ -301,211 +213,107 @@ Extract stock exchange listing information and normalize the output using the ru
     - Financial Implications (Negative/Positive)
 
 ------------------------------------------
-REQUIRED OUTPUT FORMAT (STRICT)
+SECTOR CLASSIFICATION
 ------------------------------------------
+- Classify "entity_details.sector" from the business activity and products/services, using only the values allowed by the response schema.
+"""
 
-Return ONLY this JSON structure:
-
-{
-  "section": "A",
-  "confidence_score": null,
-
-  "entity_details": {
-    "cin": "",
-    "name": "",
-    "year_of_incorporation": null,
-    "registered_office_address": "",
-    "corporate_office_address": "",
-    "email": "",
-    "telephone": "",
-    "website": "",
-    "financial_year": "",
-    "stock_exchange_listing": "N/A",
-    "paid_up_capital": null,
-    "contact_person_details": "",
-    "reporting_boundary": "",
-    "assurance_provider": "",
-    "assurance_type": "",
-    "sector": ""
-  },
-
-  "business_activity": {
-    "main_activity_description": "",
-    "description": "",
-    "percent_of_turnover": null
-  },
-
-  "products_services": [
-    {
-      "product_service": "",
-      "nic_code": "",
-      "percent_of_total_turnover": null
-    }
-  ],
-
-  "locations": {
-    "national_plants": null,
-    "national_offices": null,
-    "international_plants": null,
-    "international_offices": null
-  },
-
-  "markets_served": {
-    "international_countries": null,
-    "export_percent": null,
-    "customers_brief": ""
-  },
-
-  "employees": {
-    "employees": {
-      "total_permanent": null,
-      "permanent_male": null,
-      "permanent_female": null,
-      "other_than_permanent": null,
-      "other_than_permanent_male": null,
-      "other_than_permanent_female": null,
-      "total_employees": null,
-      "total_male": null,
-      "total_female": null
-    },
-    "workers": {
-      "total_permanent": null,
-      "permanent_male": null,
-      "permanent_female": null,
-      "other_than_permanent": null,
-      "other_than_permanent_male": null,
-      "other_than_permanent_female": null,
-      "total_workers": null,
-      "total_male": null,
-      "total_female": null
-    },
-    "differently_abled_employees": {
-      "total_permanent": null,
-      "permanent_male": null,
-      "permanent_female": null,
-      "other_than_permanent": null,
-      "other_than_permanent_male": null,
-      "other_than_permanent_female": null,
-      "total_employees": null,
-      "total_male": null,
-      "total_female": null
-    },
-    "differently_abled_workers": {
-      "total_permanent": null,
-      "permanent_male": null,
-      "permanent_female": null,
-      "other_than_permanent": null,
-      "other_than_permanent_male": null,
-      "other_than_permanent_female": null,
-      "total_workers": null,
-      "total_male": null,
-      "total_female": null
-    }
-  },
-
-  "women_representation": {
-    "board_of_directors_total": null,
-    "board_of_directors_women": null,
-    "kmp_total": null,
-    "kmp_women": null
-  },
-
-  "turnover_rate": {
-    "permanent_employees": {
-      "male": null,
-      "female": null,
-      "total": null
-    },
-    "permanent_workers": {
-      "male": null,
-      "female": null,
-      "total": null
-    }
-  },
+# The prompt never changes, so build its request Part once instead of per upload.
+PROMPT_PART = GeminiService.prompt_part(PROMPT)
 
-  "holding_subsidiaries": [
-    {
-      "name": "",
-      "type": "",
-      "percent_shares_held": null
-    }
-  ],
-
-  "csr": {
-    "is_applicable": "",
-    "turnover_inr_cr": null,
-    "net_worth_inr_cr": null
-  },
-
-  "grievances": {
-    "mechanism_in_place": {
-      "communities": "Yes/No",
-      "investors_other_than_shareholders": "Yes/No",
-      "shareholders": "Yes/No",
-      "employees_and_workers": "Yes/No",
-      "customers": "Yes/No",
-      "value_chain_partners": "Yes/No",
-      "other_please_specify": "Yes/No"
-    },    
-    "filed": {},
-    "pending": {}
-  },
-
-  "material_risks_opportunities": {
-    "environment": [
-      {
-        "material_issue": "",
-        "risk_or_opportunity": "",
-        "rationale": "",
-        "financial_implications": ""
-      }
-    ],
-    "social": [
-      {
-        "material_issue": "",
-        "risk_or_opportunity": "",
-        "rationale": "",
-        "financial_implications": ""
-      }
-    ],
-    "governance": [
-      {
-        "material_issue": "",
-        "risk_or_opportunity": "",
-        "rationale": "",
-        "financial_implications": ""
-      }
-    ]
-  }
-}
 
-------------------------------------------
-CONFIDENCE SCORE CALCULATION
-------------------------------------------
+def _read_spool(path):
+  with open(path, "rb") as fh:
+    return fh.read()
 
-After extraction, calculate a confidence_score (0-100) based on:
-- Count total required fields in the template: 103
-- Count fields that have actual values from the PDF (not empty strings or null)
-- If a field is legitimately not mentioned in the PDF, do NOT count it as missing
-- confidence_score = (fields_with_values / total_fields) * 100
-- Round to nearest integer
-- Assign this score as "confidence_score" in the output
 
-------------------------------------------
-SECTOR CLASSIFICATION
-------------------------------------------
-- Classify the sector from business activity and products/services into one of these exact values only (Agriculture, Auto ancillary, Aviation, Building materials, Chemicals, Consumer durables, Dairy products, Defence, Diversified, Education & training, Energy, Engineering & capital goods, FMCG, Fertilizers, Financial services, Healthcare, IT, Logistics, Media & entertainment, Metals, Miscellaneous, NBFC, Packaging, Plastic pipes, Real estate, Retail, Services, Silver, Software services, Solar panel, Telecom, Textiles, Tourism & hospitality, Trading)
-- Include it under "entity_details" as "sector"
+def _remove_spool(path):
+  with contextlib.suppress(FileNotFoundError):
+    os.unlink(path)
 
-------------------------------------------
-IMPORTANT:
-------------------------------------------
-- Do not change key names.
-- Do not add keys.
-- Do not remove keys.
-- Do not nest differently.
-- Output ONLY valid JSON.
-"""
+
+async def _extract(file_bytes):
+  """Full Section A extraction, or a JSON Patch against a near-identical cached report."""
+  gemini = get_gemini_service()
+  if not settings.SEMANTIC_CACHE_ENABLED:
+    return await gemini.extract_section_a(
+      file_bytes, PROMPT_PART, cached_prompt=PROMPT, response_schema=SectionAResponse
+    )
+
+  cached, embedding = None, None
+  try:
+    cached, embedding = await semantic_cache.lookup(file_bytes)
+  except Exception:
+    logging.exception("Semantic cache lookup failed")
+
+  parsed = None
+  if cached is not None:
+    try:
+      ops = await gemini.extract_section_a(file_bytes, semantic_cache.build_diff_prompt(cached))
+      parsed = semantic_cache.apply_patch(cached, ops)
+    except Exception:
+      logging.exception("Semantic cache patch failed; running full extraction")
+  if parsed is None:
+    parsed = await gemini.extract_section_a(
+      file_bytes, PROMPT_PART, cached_prompt=PROMPT, response_schema=SectionAResponse
+    )
+
+  if embedding is not None and isinstance(parsed, dict) and "raw_response" not in parsed:
+    try:
+      await semantic_cache.store(embedding, parsed)
+    except Exception:
+      logging.exception("Semantic cache store failed")
+  return parsed
+
+
+async def process_document(oid, fetch_pdf):
+  """Extract one document and record the outcome on its Mongo record.
+
+  `fetch_pdf` is an async callable returning the PDF bytes. It is awaited
+  only once a Gemini slot is free, so queued PDFs are not held in memory.
+  Shared by in-process tasks and the queue worker (app.services.processing).
+  `oid` is the document's ObjectId.
+  """
+  try:
+    async with _gemini_sem:
+      parsed = await _extract(await fetch_pdf())
+    if isinstance(parsed, dict) and "raw_response" not in parsed:
+      normalize_section_a(parsed)
+      parsed["confidence_score"] = compute_confidence(parsed)
+    update = {
+      "status": "completed",
+      "extracted_json": parsed
+    }
+  except Exception as e:
+    logging.exception("Gemini extraction failed for %s", oid)
+    update = {
+      "status": "failed",
+      "error_message": str(e)
+    }
+  try:
+    # parsed_at is stamped server-side.
+    await documents_collection().update_one(
+      {"_id": oid},
+      {"$set": update, "$currentDate": {"parsed_at": True}}
+    )
+  except Exception:
+    logging.exception("Failed to update document %s", oid)
+
+
+async def _process_spooled(oid, pdf_path, file_url):
+  async def fetch_pdf():
+    try:
+      return await asyncio.to_thread(_read_spool, pdf_path)
+    except FileNotFoundError:
+      # The spool was cleaned up underneath us (e.g. tmp reaping); the
+      # uploaded copy in storage is authoritative.
+      logging.warning("Spool file for %s missing; downloading from storage", oid)
+      return await StorageService.download_file(file_url)
+
+  try:
+    await process_document(oid, fetch_pdf)
+  finally:
+    _remove_spool(pdf_path)
 
 # =========================
 # UPLOAD + PARSE ENDPOINT
@@ -523,6 +331,10 @@ async def upload_pdfs(
   and process each file in background to extract JSON via Gemini and update
   the document status.
   """
+  # Temp files written by this request; any not handed to a background job
+  # are removed when the request finishes.
+  spooled = []
+  handed_off = set()
   try:
     # Accept both multipart field names:
     # - files: multiple
@@ -535,86 +347,193 @@ async def upload_pdfs(
       raise HTTPException(status_code=400, detail="No files uploaded")
 
     coll = documents_collection()
+    # One timestamp for every document created by this request.
+    now = datetime.now(timezone.utc)
     created = []
+    pending_docs = []
+    jobs = []
     skipped_duplicates = []
     skipped_invalid = []
+    failed_uploads = []
 
-    async def _process_and_update(doc_id, file_bytes):
-      try:
-        parsed = await gemini.extract_section_a(file_bytes, PROMPT)
-        update = {
-          "status": "completed",
-          "extracted_json": parsed,
-          "parsed_at": datetime.utcnow()
-        }
-      except Exception as e:
-        logging.exception("Gemini extraction failed for %s", doc_id)
-        update = {
-          "status": "failed",
-          "error_message": str(e),
-          "parsed_at": datetime.utcnow()
-        }
-      try:
-        await coll.update_one({"_id": ObjectId(doc_id)}, {"$set": update})
-      except Exception:
-        logging.exception("Failed to update document %s", doc_id)
-
-    for uploaded_file in upload_list:
+    async def _read(uploaded_file):
+      """Validate and read one file; returns a dict with an `outcome`."""
       file_name = (uploaded_file.filename or "").strip()
 
       if not file_name.lower().endswith(".pdf"):
-        skipped_invalid.append(file_name or "unknown")
-        continue
+        return {"outcome": "invalid", "file_name": file_name or "unknown"}
+
+      # Spool to disk in chunks, hashing in the same pass, so neither an
+      # oversized file nor a large batch is ever buffered whole in memory.
+      tmp = tempfile.NamedTemporaryFile(prefix="brsr-", suffix=".pdf", delete=False)
+      spooled.append(tmp.name)
+      hasher = hashlib.sha256()
+      size = 0
+      head = b""
+      tail = b""
+
+      def _spool(chunk):
+        tmp.write(chunk)
+        hasher.update(chunk)
+
+      with tmp:
+        while chunk := await uploaded_file.read(UPLOAD_CHUNK_SIZE):
+          if not head:
+            head = chunk[:len(PDF_MAGIC)]
+            # Reject mislabeled files before spooling the rest of them.
+            if head != PDF_MAGIC:
+              return {"outcome": "invalid", "file_name": file_name}
+          size += len(chunk)
+          if size > settings.MAX_UPLOAD_BYTES:
+            logging.warning("Rejecting %s: larger than %s bytes", file_name, settings.MAX_UPLOAD_BYTES)
+            return {"outcome": "invalid", "file_name": file_name}
+          # Disk write and hash run in a worker thread (hashlib drops the GIL
+          # on large buffers), so big uploads don't stall the event loop.
+          await asyncio.to_thread(_spool, chunk)
+          tail = (tail + chunk[-PDF_TRAILER_WINDOW:])[-PDF_TRAILER_WINDOW:]
+      # Truncated uploads have no end-of-file marker; don't pay for storage
+      # and a Gemini call that is bound to fail.
+      if not size or PDF_EOF not in tail:
+        return {"outcome": "invalid", "file_name": file_name}
+
+      return {
+        "outcome": "ok",
+        "file_name": file_name,
+        "pdf_path": tmp.name,
+        "file_hash": hasher.hexdigest(),
+      }
 
-      file_bytes = await uploaded_file.read()
-      if not file_bytes:
-        skipped_invalid.append(file_name)
-        continue
+    async def _upload(item):
+      async with upload_semaphore:
+        return await StorageService.upload_file_path(
+          local_path=item["pdf_path"],
+          file_path=f"{user['sub']}_{item['file_name']}",
+          file_hash=item["file_hash"],
+        )
 
-      existing_doc = await coll.find_one(
-        {"user_id": user["sub"], "file_name": file_name},
-        {"_id": 1}
+    # Pass 1: validate, read and hash every file concurrently.
+    read_results = await asyncio.gather(*[_read(f) for f in upload_list], return_exceptions=True)
+
+    accepted = []
+    for uploaded_file, result in zip(upload_list, read_results):
+      if isinstance(result, BaseException):
+        logging.error("Failed to read file %s for user %s: %s", uploaded_file.filename, user["sub"], result)
+        failed_uploads.append(uploaded_file.filename or "unknown")
+      elif result["outcome"] == "invalid":
+        skipped_invalid.append(result["file_name"])
+      else:
+        accepted.append(result)
+
+    # One query for names this user already uploaded and one for completed
+    # extractions of identical bytes (from any upload), issued together.
+    names = [item["file_name"] for item in accepted]
+    hashes = list({item["file_hash"] for item in accepted})
+    existing, cached = [], []
+    if accepted:
+      existing, cached = await asyncio.gather(
+        coll.find(
+          {"user_id": user["sub"], "file_name": {"$in": names}},
+          {"_id": 0, "file_name": 1}
+        ).to_list(length=None),
+        coll.find(
+          {"file_hash": {"$in": hashes}, "status": "completed"},
+          {"_id": 0, "file_hash": 1, "extracted_json": 1}
+        ).to_list(length=None),
       )
-      if existing_doc:
-        skipped_duplicates.append(file_name)
+    seen_names = {d["file_name"] for d in existing}
+    cached_by_hash = {}
+    for d in cached:
+      cached_by_hash.setdefault(d["file_hash"], d.get("extracted_json"))
+
+    to_upload = []
+    for item in accepted:
+      if item["file_name"] in seen_names:
+        skipped_duplicates.append(item["file_name"])
         continue
+      seen_names.add(item["file_name"])
+      to_upload.append(item)
 
-      # Upload to Supabase
-      file_path = f"{user['sub']}_{file_name}"
-      try:
-        file_url = await StorageService.upload_file(
-          file_bytes=file_bytes,
-          file_path=file_path
-        )
-      except DuplicateFileError:
+    # Pass 2: upload the new files to Supabase concurrently.
+    upload_results = await asyncio.gather(*[_upload(item) for item in to_upload], return_exceptions=True)
+
+    for item, file_url in zip(to_upload, upload_results):
+      file_name = item["file_name"]
+      if isinstance(file_url, DuplicateFileError):
         skipped_duplicates.append(file_name)
         continue
-
-      if not file_url:
-        logging.error("Failed to upload file %s for user %s", file_name, user["sub"])
+      if isinstance(file_url, BaseException) or not file_url:
+        logging.error("Failed to upload file %s for user %s: %s", file_name, user["sub"], file_url)
+        failed_uploads.append(file_name)
         continue
 
-      # Create DB record with status pending
+      # Queue DB record with status pending; the id is generated client-side
+      # so all records can be written in one insert_many below.
+      oid = ObjectId()
       document = {
+        "_id": oid,
         "user_id": user["sub"],
         "file_name": file_name,
         "file_url": file_url,
+        "file_hash": item["file_hash"],
         "status": "pending",
-        "created_at": datetime.utcnow()
+        "created_at": now
       }
-      res = await coll.insert_one(document)
-      doc_id = str(res.inserted_id)
-      created.append({"document_id": doc_id, "file_url": file_url, "file_name": file_name})
-
-      # schedule background processing
-      # use asyncio.create_task to run async worker without blocking response
-      asyncio.create_task(_process_and_update(doc_id, file_bytes))
+      cached_json = cached_by_hash.get(item["file_hash"])
+      if cached_json is not None:
+        # Content-hash hit: store the extraction directly, no Gemini job needed.
+        document.update({
+          "status": "completed",
+          "extracted_json": cached_json,
+          "parsed_at": now
+        })
+      else:
+        jobs.append((oid, item["pdf_path"], file_url))
+      pending_docs.append(document)
+      created.append({"document_id": str(oid), "file_url": file_url, "file_name": file_name})
+
+    if pending_docs:
+      try:
+        await coll.insert_many(pending_docs, ordered=False)
+      except BulkWriteError as e:
+        # The unique {user_id, file_name} index is the authoritative dedupe: a
+        # concurrent request may have inserted the same name since the check.
+        write_errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in write_errors):
+          raise
+        dup_ids = {pending_docs[err["index"]]["_id"] for err in write_errors}
+        skipped_duplicates.extend(d["file_name"] for d in pending_docs if d["_id"] in dup_ids)
+        created = [c for c in created if ObjectId(c["document_id"]) not in dup_ids]
+        jobs = [job for job in jobs if job[0] not in dup_ids]
+
+    # schedule background processing: on the task queue when REDIS_URL is
+    # set (the worker downloads the PDF from storage), otherwise in-process.
+    queued = set()
+    if settings.REDIS_URL and jobs:
+      enqueued = await asyncio.gather(
+        *[enqueue_extraction(str(oid), file_url) for oid, _, file_url in jobs],
+        return_exceptions=True
+      )
+      for (oid, _, _), result in zip(jobs, enqueued):
+        if isinstance(result, BaseException):
+          logging.error("Failed to enqueue %s, processing in-process: %s", oid, result)
+        else:
+          queued.add(oid)
+
+    for oid, pdf_path, file_url in jobs:
+      if oid in queued:
+        continue
+      # The job owns its spool file from here on and removes it when done.
+      handed_off.add(pdf_path)
+      task = asyncio.create_task(_process_spooled(oid, pdf_path, file_url))
+      _background_tasks.add(task)
+      task.add_done_callback(_background_tasks.discard)
 
     return {
       "message": "Files received",
       "documents": created,
       "skipped_duplicates": skipped_duplicates,
       "skipped_invalid": skipped_invalid,
+      "failed_uploads": failed_uploads,
     }
 
   except HTTPException:
@@ -623,3 +542,8 @@ async def upload_pdfs(
   except Exception as e:
     logging.exception("Upload failed")
     raise HTTPException(status_code=500, detail=str(e))
+
+  finally:
+    for path in spooled:
+      if path not in handed_off:
+        _remove_spool(path)
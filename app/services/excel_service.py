@@ -1,13 +1,207 @@
+import functools
 import io
 import json
+import logging
+import math
+import os
+import tempfile
+import openpyxl
+import orjson
 import pandas as pd
-from typing import List, Dict, Any, Optional
+import xlsxwriter
+from concurrent.futures import ThreadPoolExecutor
+from openpyxl.xml import LXML as OPENPYXL_HAS_LXML
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import glob
 
+_GROUP_ENTITY_MAP = {
+    "associate": "Associate Company",
+    "associate company": "Associate Company",
+    "joint venture": "Joint Venture",
+    "subsidiary": "Subsidiary Company",
+    "subsidiary company": "Subsidiary Company",
+    "material wholly owned subsidiary": "Wholly Owned Subsidiary",
+    "step down wholly owned subsidiary": "Wholly Owned Subsidiary",
+    "wholly owned subsidiary": "Wholly Owned Subsidiary",
+    "holding": "Holding Company",
+    "intermediary holding": "Intermediary Holding Company",
+    "ultimate holding": "Ultimate Holding Company",
+    "step-down subsidiary": "Step-Down Subsidiary",
+    "subsidiary (incorporated under section 8 of the companies act, 2013)": "Subsidiary Company",
+}
+
+# Fallbacks for free-text types, checked in order: first rule whose
+# substrings all occur in the lowercased type wins.
+_GROUP_SUBSTRING_RULES = (
+    (("wholly owned",), "Wholly Owned Subsidiary"),
+    (("ultimate holding",), "Ultimate Holding Company"),
+    (("intermediary", "holding"), "Intermediary Holding Company"),
+    (("associate",), "Associate Company"),
+    (("joint", "venture"), "Joint Venture"),
+)
+
+
+# Column name -> path into the extracted JSON, in sheet order. Integer steps
+# index into lists (the first product / holding); a None path is a blank
+# section-header column.
+_BASE_ROW_FIELDS: Tuple[Tuple[str, Optional[Tuple[Any, ...]]], ...] = (
+    # core fields (1-15)
+    ("Sector", ("entity_details", "sector")),
+    ("1. Corporate Identity Number (CIN)", ("entity_details", "cin")),
+    ("2. Name of Listed Entity", ("entity_details", "name")),
+    ("3. Year of Incorporation", ("entity_details", "year_of_incorporation")),
+    ("4. Registered office address", ("entity_details", "registered_office_address")),
+    ("5. Corporate office address", ("entity_details", "corporate_office_address")),
+    ("6. Email ID", ("entity_details", "email")),
+    ("7. Telephone number", ("entity_details", "telephone")),
+    ("8. Website", ("entity_details", "website")),
+    ("9. Financial Year", ("entity_details", "financial_year")),
+    ("10. Stock Exchange Listing", ("entity_details", "stock_exchange_listing")),
+    ("11. Paid-up Capital", ("entity_details", "paid_up_capital")),
+    ("12. Contact Person Details", ("entity_details", "contact_person_details")),
+    ("13. Reporting boundary", ("entity_details", "reporting_boundary")),
+    ("14. Name of assurance provider", ("entity_details", "assurance_provider")),
+    ("15. Type of assurance", ("entity_details", "assurance_type")),
+    # business activity (16)
+    ("16. Business Activity", None),
+    ("16.a Main Business Activity", ("business_activity", "main_activity_description")),
+    ("16.b Description of Business Activity", ("business_activity", "description")),
+    ("16.c % of Turnover", ("business_activity", "percent_of_turnover")),
+    # products (17)
+    ("17. Products/Services", None),
+    ("17.a Product/Service", ("products_services", 0, "product_service")),
+    ("17.b NIC Code", ("products_services", 0, "nic_code")),
+    ("17.c % Turnover", ("products_services", 0, "percent_of_total_turnover")),
+    # locations (18)
+    ("18. Number of Locations", None),
+    ("18.a National Plants", ("locations", "national_plants")),
+    ("18.b National Offices", ("locations", "national_offices")),
+    ("18.c International Plants", ("locations", "international_plants")),
+    ("18.d International Offices", ("locations", "international_offices")),
+    # markets (19)
+    ("19.a International Countries", ("markets_served", "international_countries")),
+    ("19.b Export %", ("markets_served", "export_percent")),
+    ("19.c Customers Brief", ("markets_served", "customers_brief")),
+    # employees/workers (20)
+    ("20. Employees and Workers", None),
+    ("20.A Total Permanent Employees", ("employees", "employees", "total_permanent")),
+    ("20.A Permanent Male Employees", ("employees", "employees", "permanent_male")),
+    ("20.A Permanent Female Employees", ("employees", "employees", "permanent_female")),
+    ("20.A Other than Permanent", ("employees", "employees", "other_than_permanent")),
+    ("20.A Other Male", ("employees", "employees", "other_than_permanent_male")),
+    ("20.A Other Female", ("employees", "employees", "other_than_permanent_female")),
+    ("20.A Total Employees", ("employees", "employees", "total_employees")),
+    ("20.A Total Male", ("employees", "employees", "total_male")),
+    ("20.A Total Female", ("employees", "employees", "total_female")),
+    ("20.B Permanent Workers", ("employees", "workers", "total_permanent")),
+    ("20.B Permanent Male Workers", ("employees", "workers", "permanent_male")),
+    ("20.B Permanent Female Workers", ("employees", "workers", "permanent_female")),
+    ("20.B Other Workers", ("employees", "workers", "other_than_permanent")),
+    ("20.B Other Male Workers", ("employees", "workers", "other_than_permanent_male")),
+    ("20.B Other Female Workers", ("employees", "workers", "other_than_permanent_female")),
+    ("20.B Total Workers", ("employees", "workers", "total_workers")),
+    ("20.B Total Male Workers", ("employees", "workers", "total_male")),
+    ("20.B Total Female Workers", ("employees", "workers", "total_female")),
+    ("20.C DA Employees Total Permanent", ("employees", "differently_abled_employees", "total_permanent")),
+    ("20.C DA Permanent Male", ("employees", "differently_abled_employees", "permanent_male")),
+    ("20.C DA Permanent Female", ("employees", "differently_abled_employees", "permanent_female")),
+    ("20.C DA Other", ("employees", "differently_abled_employees", "other_than_permanent")),
+    ("20.C DA Other Male", ("employees", "differently_abled_employees", "other_than_permanent_male")),
+    ("20.C DA Other Female", ("employees", "differently_abled_employees", "other_than_permanent_female")),
+    ("20.C DA Total Employees", ("employees", "differently_abled_employees", "total_employees")),
+    # women representation (21)
+    ("21. Women Representation", None),
+    ("21.a Board Total", ("women_representation", "board_of_directors_total")),
+    ("21.b Board Women", ("women_representation", "board_of_directors_women")),
+    ("21.c KMP Total", ("women_representation", "kmp_total")),
+    ("21.d KMP Women", ("women_representation", "kmp_women")),
+    # turnover (22)
+    ("22. Turnover Rate", None),
+    ("22.a Emp Male", ("turnover_rate", "permanent_employees", "male")),
+    ("22.b Emp Female", ("turnover_rate", "permanent_employees", "female")),
+    ("22.c Emp Total", ("turnover_rate", "permanent_employees", "total")),
+    ("22.d Worker Male", ("turnover_rate", "permanent_workers", "male")),
+    ("22.e Worker Female", ("turnover_rate", "permanent_workers", "female")),
+    ("22.f Worker Total", ("turnover_rate", "permanent_workers", "total")),
+    # holdings (23)
+    ("23. Group Entity", ("holding_subsidiaries", 0, "name")),
+    ("23. Group Entity Type", ("holding_subsidiaries", 0, "type")),
+    ("23. Mapped Group Entity Type", None),  # filled in by build_base_row
+    ("23. % Shares", ("holding_subsidiaries", 0, "percent_shares_held")),
+    # CSR (24)
+    ("24.a CSR Applicable", ("csr", "is_applicable")),
+    ("24.b CSR Turnover", ("csr", "turnover_inr_cr")),
+    ("24.c CSR Net Worth", ("csr", "net_worth_inr_cr")),
+    # grievances (25)
+    ("25. Grievance Redressal", None),
+    ("25.a Communities", ("grievances", "mechanism_in_place", "communities")),
+    ("25.a Investors (other than shareholders)", ("grievances", "mechanism_in_place", "investors_other_than_shareholders")),
+    ("25.a Shareholders", ("grievances", "mechanism_in_place", "shareholders")),
+    ("25.a Employees and workers", ("grievances", "mechanism_in_place", "employees_and_workers")),
+    ("25.a Customers", ("grievances", "mechanism_in_place", "customers")),
+    ("25.a Value Chain Partners", ("grievances", "mechanism_in_place", "value_chain_partners")),
+    ("25.a Others", ("grievances", "mechanism_in_place", "other_please_specify")),
+    ("25.b Communities", ("grievances", "filed", "communities")),
+    ("25.b Investors (other than shareholders)", ("grievances", "filed", "investors_other_than_shareholders")),
+    ("25.b Shareholders", ("grievances", "filed", "shareholders")),
+    ("25.b Employees and workers", ("grievances", "filed", "employees_and_workers")),
+    ("25.b Customers", ("grievances", "filed", "customers")),
+    ("25.b Value Chain Partners", ("grievances", "filed", "value_chain_partners")),
+    ("25.b Others", ("grievances", "filed", "other_please_specify")),
+    ("25.c Communities", ("grievances", "pending", "communities")),
+    ("25.c Investors (other than shareholders)", ("grievances", "pending", "investors_other_than_shareholders")),
+    ("25.c Shareholders", ("grievances", "pending", "shareholders")),
+    ("25.c Employees and workers", ("grievances", "pending", "employees_and_workers")),
+    ("25.c Customers", ("grievances", "pending", "customers")),
+    ("25.c Value Chain Partners", ("grievances", "pending", "value_chain_partners")),
+    ("25.c Others", ("grievances", "pending", "other_please_specify")),
+)
+
+
+def _lookup(data: Any, path: Tuple[Any, ...]) -> Any:
+    for key in path:
+        if isinstance(key, int):
+            data = data[key] if isinstance(data, list) and len(data) > key else None
+        elif isinstance(data, dict):
+            data = data.get(key)
+        else:
+            return None
+    return data
+
+RISK_CATEGORIES = ("environment", "social", "governance")
+
+
+def _risks_by_category(risks_obj: Any) -> Dict[str, List[Dict[str, Any]]]:
+    """Material issues per category, from either shape Gemini returns.
+
+    A dict is used as-is. In a list, an element carrying a category's list
+    contributes that list; any other element that looks like an issue is
+    counted under every category that element has no list for.
+    """
+    if isinstance(risks_obj, dict):
+        return {c: risks_obj.get(c, []) or [] for c in RISK_CATEGORIES}
+    out: Dict[str, List[Dict[str, Any]]] = {c: [] for c in RISK_CATEGORIES}
+    if isinstance(risks_obj, list):
+        for el in risks_obj:
+            if not isinstance(el, dict):
+                continue
+            is_issue = any(k in el for k in ("material_issue", "rationale", "risk_or_opportunity"))
+            for c in RISK_CATEGORIES:
+                if c in el and isinstance(el[c], list):
+                    out[c].extend(el[c])
+                elif is_issue:
+                    out[c].append(el)
+    return out
+
+
 # Optional: supabase client for cloud uploads. Keep import local in functions
 # to avoid hard dependency if not used at runtime.
 
 
+# Upper bound on threads reading JSON files for one export.
+JSON_LOAD_WORKERS = 8
+
+
 class ExcelService:
     """Service helpers to build a BRSR-style Excel and return either a file
     on disk or in-memory bytes suitable for returning from a web handler.
@@ -18,8 +212,28 @@ class ExcelService:
 
     @staticmethod
     def load_json(path: str) -> Dict[str, Any]:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        # orjson parses the raw bytes directly, skipping a separate UTF-8 decode.
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+
+    @staticmethod
+    def load_json_cached(path: str) -> Dict[str, Any]:
+        """`load_json`, served from memory while the file's mtime and size are unchanged.
+
+        The returned dict is shared between callers; treat it as read-only.
+        """
+        st = os.stat(path)
+        return _load_json_cached(path, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def load_json_many(json_paths: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yield `load_json_cached` for each path, in order, reading files on a small
+        thread pool so disk reads overlap while earlier documents are converted."""
+        if len(json_paths) <= 1:
+            yield from (ExcelService.load_json_cached(path) for path in json_paths)
+            return
+        with ThreadPoolExecutor(max_workers=min(JSON_LOAD_WORKERS, len(json_paths))) as ex:
+            yield from ex.map(ExcelService.load_json_cached, json_paths)
 
     @staticmethod
     def safe_get(d, *keys):
@@ -34,34 +248,13 @@ class ExcelService:
         if not raw:
             return ""
         key = raw.strip().lower()
-        mapping = {
-            "associate": "Associate Company",
-            "associate company": "Associate Company",
-            "joint venture": "Joint Venture",
-            "subsidiary": "Subsidiary Company",
-            "subsidiary company": "Subsidiary Company",
-            "material wholly owned subsidiary": "Wholly Owned Subsidiary",
-            "step down wholly owned subsidiary": "Wholly Owned Subsidiary",
-            "wholly owned subsidiary": "Wholly Owned Subsidiary",
-            "holding": "Holding Company",
-            "intermediary holding": "Intermediary Holding Company",
-            "ultimate holding": "Ultimate Holding Company",
-            "step-down subsidiary": "Step-Down Subsidiary",
-            "subsidiary (incorporated under section 8 of the companies act, 2013)": "Subsidiary Company",
-        }
-        if key in mapping:
-            return mapping[key]
-        if "wholly owned" in key:
-            return "Wholly Owned Subsidiary"
-        if "ultimate holding" in key:
-            return "Ultimate Holding Company"
-        if "intermediary" in key and "holding" in key:
-            return "Intermediary Holding Company"
-        if "associate" in key:
-            return "Associate Company"
-        if "joint" in key and "venture" in key:
-            return "Joint Venture"
-        if key == "holding" or key.endswith(" holding"):
+        mapped = _GROUP_ENTITY_MAP.get(key)
+        if mapped:
+            return mapped
+        for needles, label in _GROUP_SUBSTRING_RULES:
+            if all(n in key for n in needles):
+                return label
+        if key.endswith(" holding"):
             return "Holding Company"
         if "subsidiary" in key:
             return "Subsidiary Company"
@@ -69,199 +262,41 @@ class ExcelService:
 
     @staticmethod
     def build_base_row(data: Dict[str, Any]) -> Dict[str, Any]:
-        entity = data.get("entity_details", {})
-        business = data.get("business_activity", {})
-        products = data.get("products_services", [])
-        locations = data.get("locations", {})
-        markets = data.get("markets_served", {})
-        employees = data.get("employees", {})
-        women = data.get("women_representation", {})
-        turnover = data.get("turnover_rate", {})
-        csr = data.get("csr", {})
-        grievances = data.get("grievances", {})
-
-        product = products[0] if products else {}
-        row: Dict[str, Any] = {}
-
-        # core fields (1-15)
-        row["Sector"] = entity.get("sector")
-        row["1. Corporate Identity Number (CIN)"] = entity.get("cin")
-        row["2. Name of Listed Entity"] = entity.get("name")
-        row["3. Year of Incorporation"] = entity.get("year_of_incorporation")
-        row["4. Registered office address"] = entity.get("registered_office_address")
-        row["5. Corporate office address"] = entity.get("corporate_office_address")
-        row["6. Email ID"] = entity.get("email")
-        row["7. Telephone number"] = entity.get("telephone")
-        row["8. Website"] = entity.get("website")
-        row["9. Financial Year"] = entity.get("financial_year")
-        row["10. Stock Exchange Listing"] = entity.get("stock_exchange_listing")
-        row["11. Paid-up Capital"] = entity.get("paid_up_capital")
-        row["12. Contact Person Details"] = entity.get("contact_person_details")
-        row["13. Reporting boundary"] = entity.get("reporting_boundary")
-        row["14. Name of assurance provider"] = entity.get("assurance_provider")
-        row["15. Type of assurance"] = entity.get("assurance_type")
-
-        # business activity (16)
-        row["16. Business Activity"] = ""
-        row["16.a Main Business Activity"] = business.get("main_activity_description")
-        row["16.b Description of Business Activity"] = business.get("description")
-        row["16.c % of Turnover"] = business.get("percent_of_turnover")
-
-        # products (17)
-        row["17. Products/Services"] = ""
-        row["17.a Product/Service"] = product.get("product_service")
-        row["17.b NIC Code"] = product.get("nic_code")
-        row["17.c % Turnover"] = product.get("percent_of_total_turnover")
-
-        # locations (18)
-        row["18. Number of Locations"] = ""
-        row["18.a National Plants"] = locations.get("national_plants")
-        row["18.b National Offices"] = locations.get("national_offices")
-        row["18.c International Plants"] = locations.get("international_plants")
-        row["18.d International Offices"] = locations.get("international_offices")
-
-        # markets (19)
-        row["19.a International Countries"] = markets.get("international_countries")
-        row["19.b Export %"] = markets.get("export_percent")
-        row["19.c Customers Brief"] = markets.get("customers_brief")
-
-        # employees/workers (20)
-        row["20. Employees and Workers"] = ""
-        emp = employees.get("employees", {})
-        row["20.A Total Permanent Employees"] = emp.get("total_permanent")
-        row["20.A Permanent Male Employees"] = emp.get("permanent_male")
-        row["20.A Permanent Female Employees"] = emp.get("permanent_female")
-        row["20.A Other than Permanent"] = emp.get("other_than_permanent")
-        row["20.A Other Male"] = emp.get("other_than_permanent_male")
-        row["20.A Other Female"] = emp.get("other_than_permanent_female")
-        row["20.A Total Employees"] = emp.get("total_employees")
-        row["20.A Total Male"] = emp.get("total_male")
-        row["20.A Total Female"] = emp.get("total_female")
-
-        workers = employees.get("workers", {})
-        row["20.B Permanent Workers"] = workers.get("total_permanent")
-        row["20.B Permanent Male Workers"] = workers.get("permanent_male")
-        row["20.B Permanent Female Workers"] = workers.get("permanent_female")
-        row["20.B Other Workers"] = workers.get("other_than_permanent")
-        row["20.B Other Male Workers"] = workers.get("other_than_permanent_male")
-        row["20.B Other Female Workers"] = workers.get("other_than_permanent_female")
-        row["20.B Total Workers"] = workers.get("total_workers")
-        row["20.B Total Male Workers"] = workers.get("total_male")
-        row["20.B Total Female Workers"] = workers.get("total_female")
-
-        da_emp = employees.get("differently_abled_employees", {})
-        row["20.C DA Employees Total Permanent"] = da_emp.get("total_permanent")
-        row["20.C DA Permanent Male"] = da_emp.get("permanent_male")
-        row["20.C DA Permanent Female"] = da_emp.get("permanent_female")
-        row["20.C DA Other"] = da_emp.get("other_than_permanent")
-        row["20.C DA Other Male"] = da_emp.get("other_than_permanent_male")
-        row["20.C DA Other Female"] = da_emp.get("other_than_permanent_female")
-        row["20.C DA Total Employees"] = da_emp.get("total_employees")
-
-        # women representation (21)
-        row["21. Women Representation"] = ""
-        row["21.a Board Total"] = women.get("board_of_directors_total")
-        row["21.b Board Women"] = women.get("board_of_directors_women")
-        row["21.c KMP Total"] = women.get("kmp_total")
-        row["21.d KMP Women"] = women.get("kmp_women")
-
-        # turnover (22)
-        row["22. Turnover Rate"] = ""
-        row["22.a Emp Male"] = ExcelService.safe_get(turnover, "permanent_employees", "male")
-        row["22.b Emp Female"] = ExcelService.safe_get(turnover, "permanent_employees", "female")
-        row["22.c Emp Total"] = ExcelService.safe_get(turnover, "permanent_employees", "total")
-        row["22.d Worker Male"] = ExcelService.safe_get(turnover, "permanent_workers", "male")
-        row["22.e Worker Female"] = ExcelService.safe_get(turnover, "permanent_workers", "female")
-        row["22.f Worker Total"] = ExcelService.safe_get(turnover, "permanent_workers", "total")
-
-        # holdings (23)
-        holdings = data.get("holding_subsidiaries", [])
-        first_holding = holdings[0] if holdings else {}
-        row["23. Group Entity"] = first_holding.get("name")
-        raw_type = first_holding.get("type")
-        row["23. Group Entity Type"] = raw_type
-        row["23. Mapped Group Entity Type"] = ExcelService.map_group_entity_type(raw_type)
-        row["23. % Shares"] = first_holding.get("percent_shares_held")
-
-        # CSR (24)
-        row["24.a CSR Applicable"] = csr.get("is_applicable")
-        row["24.b CSR Turnover"] = csr.get("turnover_inr_cr")
-        row["24.c CSR Net Worth"] = csr.get("net_worth_inr_cr")
-
-        # grievances (25)
-        row["25. Grievance Redressal"] = ""
-        mech = grievances.get("mechanism_in_place", {})
-        row["25.a Communities"] = mech.get("communities")
-        row["25.a Investors (other than shareholders)"] = mech.get("investors_other_than_shareholders")
-        row["25.a Shareholders"] = mech.get("shareholders")
-        row["25.a Employees and workers"] = mech.get("employees_and_workers")
-        row["25.a Customers"] = mech.get("customers")
-        row["25.a Value Chain Partners"] = mech.get("value_chain_partners")
-        row["25.a Others"] = mech.get("other_please_specify")
-
-        filed = grievances.get("filed", {})
-        row["25.b Communities"] = filed.get("communities")
-        row["25.b Investors (other than shareholders)"] = filed.get("investors_other_than_shareholders")
-        row["25.b Shareholders"] = filed.get("shareholders")
-        row["25.b Employees and workers"] = filed.get("employees_and_workers")
-        row["25.b Customers"] = filed.get("customers")
-        row["25.b Value Chain Partners"] = filed.get("value_chain_partners")
-        row["25.b Others"] = filed.get("other_please_specify")
-
-        pending = grievances.get("pending", {})
-        row["25.c Communities"] = pending.get("communities")
-        row["25.c Investors (other than shareholders)"] = pending.get("investors_other_than_shareholders")
-        row["25.c Shareholders"] = pending.get("shareholders")
-        row["25.c Employees and workers"] = pending.get("employees_and_workers")
-        row["25.c Customers"] = pending.get("customers")
-        row["25.c Value Chain Partners"] = pending.get("value_chain_partners")
-        row["25.c Others"] = pending.get("other_please_specify")
-
+        row = {name: _lookup(data, path) if path else "" for name, path in _BASE_ROW_FIELDS}
+        row["23. Mapped Group Entity Type"] = ExcelService.map_group_entity_type(row["23. Group Entity Type"])
         return row
 
+    @staticmethod
+    def build_risk_rows(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The "26." columns for each material issue, in category order."""
+        risks = _risks_by_category(data.get("material_risks_opportunities", {}))
+        return [
+            dict(zip(RISK_COLUMNS, (
+                category.capitalize(),
+                item.get("material_issue"),
+                item.get("risk_or_opportunity"),
+                item.get("rationale"),
+                item.get("financial_implications"),
+                item.get("approach_to_adapt_mitigate"),
+            )))
+            for category in RISK_CATEGORIES
+            for item in risks[category]
+        ]
+
     @staticmethod
     def expand_all(data: Dict[str, Any], base_row: Dict[str, Any]) -> List[Dict[str, Any]]:
         holdings = sorted(data.get("holding_subsidiaries", []), key=lambda x: x.get("type", ""))
-        risks = data.get("material_risks_opportunities", {})
-        risk_rows: List[Dict[str, Any]] = []
-
-        def _items_for_category(risks_obj, category_name):
-            if isinstance(risks_obj, dict):
-                return risks_obj.get(category_name, []) or []
-            if isinstance(risks_obj, list):
-                items = []
-                for el in risks_obj:
-                    if not isinstance(el, dict):
-                        continue
-                    if category_name in el and isinstance(el[category_name], list):
-                        items.extend(el[category_name])
-                        continue
-                    if any(k in el for k in ("material_issue", "rationale", "risk_or_opportunity")):
-                        items.append(el)
-                return items
-            return []
-
-        for category in ["environment", "social", "governance"]:
-            for item in _items_for_category(risks, category):
-                risk_rows.append({
-                    "26. Category": category.capitalize(),
-                    "26. Material Issue": item.get("material_issue"),
-                    "26. Risk/Opportunity": item.get("risk_or_opportunity"),
-                    "26. Rationale": item.get("rationale"),
-                    "26. Financial Impact": item.get("financial_implications"),
-                    "26. Approach to Adapt/Mitigate": item.get("approach_to_adapt_mitigate"),
-                })
+        risk_rows = ExcelService.build_risk_rows(data)
 
         max_rows = max(1, len(holdings), len(risk_rows))
         final_rows: List[Dict[str, Any]] = []
+        # Continuation rows are blank apart from the identifying CIN and name.
+        blank_row = dict.fromkeys(base_row, "")
+        blank_row["1. Corporate Identity Number (CIN)"] = base_row.get("1. Corporate Identity Number (CIN)")
+        blank_row["2. Name of Listed Entity"] = base_row.get("2. Name of Listed Entity")
 
         for i in range(max_rows):
-            if i == 0:
-                row = base_row.copy()
-            else:
-                row = {k: "" for k in base_row.keys()}
-                row["1. Corporate Identity Number (CIN)"] = base_row.get("1. Corporate Identity Number (CIN)")
-                row["2. Name of Listed Entity"] = base_row.get("2. Name of Listed Entity")
+            row = base_row.copy() if i == 0 else blank_row.copy()
 
             if i < len(holdings):
                 row["23. Group Entity"] = holdings[i].get("name")
@@ -280,69 +315,93 @@ class ExcelService:
     @staticmethod
     def expand_risks(data: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         final_rows: List[Dict[str, Any]] = []
-        risks = data.get("material_risks_opportunities", {})
-
-        def _items_for_category(risks_obj, category_name):
-            if isinstance(risks_obj, dict):
-                return risks_obj.get(category_name, []) or []
-            if isinstance(risks_obj, list):
-                items = []
-                for el in risks_obj:
-                    if not isinstance(el, dict):
-                        continue
-                    if category_name in el and isinstance(el[category_name], list):
-                        items.extend(el[category_name])
-                        continue
-                    if any(k in el for k in ("material_issue", "rationale", "risk_or_opportunity")):
-                        items.append(el)
-                return items
-            return []
+        # The risk columns don't depend on the row, so build them once.
+        risk_rows = ExcelService.build_risk_rows(data)
 
         for r in rows:
-            for category in ["environment", "social", "governance"]:
-                items = _items_for_category(risks, category)
-                for item in items:
-                    new_row = r.copy()
-                    new_row["26. Category"] = category.capitalize()
-                    new_row["26. Material Issue"] = item.get("material_issue")
-                    new_row["26. Risk/Opportunity"] = item.get("risk_or_opportunity")
-                    new_row["26. Rationale"] = item.get("rationale")
-                    new_row["26. Financial Impact"] = item.get("financial_implications")
-                    new_row["26. Approach to Adapt/Mitigate"] = item.get("approach_to_adapt_mitigate")
-                    final_rows.append(new_row)
+            for risk in risk_rows:
+                final_rows.append({**r, **risk})
 
         return final_rows
 
     # ----- Export helpers -----
     @staticmethod
-    def json_paths_to_dataframe(json_paths: List[str]) -> pd.DataFrame:
-        all_rows: List[Dict[str, Any]] = []
-        for path in json_paths:
-            data = ExcelService.load_json(path)
+    def iter_rows(json_docs: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+        """Yield one tuple per output row, ordered as `COLUMNS`."""
+        for data in json_docs:
             base = ExcelService.build_base_row(data)
-            expanded = ExcelService.expand_all(data, base)
-            all_rows.extend(expanded)
-        return pd.DataFrame(all_rows)
+            for row in ExcelService.expand_all(data, base):
+                yield tuple(row.get(c, "") for c in COLUMNS)
+
+    @staticmethod
+    def json_paths_to_dataframe(json_paths: List[str]) -> pd.DataFrame:
+        docs = ExcelService.load_json_many(json_paths)
+        return pd.DataFrame.from_records(ExcelService.iter_rows(docs), columns=COLUMNS)
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        # Blank out NaN (missing columns in a DataFrame row) and stringify
+        # nested values, which no xlsx writer can store in a cell.
+        if value is None or isinstance(value, (str, bool, int)):
+            return value
+        if isinstance(value, float):
+            return None if math.isnan(value) else value
+        return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
 
     @staticmethod
-    def dataframe_to_excel_bytes(df: pd.DataFrame, engine: str = "openpyxl") -> bytes:
-        """Return Excel file bytes for streaming to clients (no disk I/O)."""
+    def write_xlsx(buf, header: Sequence[str], rows: Iterable[Sequence[Any]], engine: str = "xlsxwriter") -> None:
+        """Stream `rows` into an xlsx workbook written to `buf`.
+
+        Both engines write row by row without keeping cell objects around:
+        xlsxwriter in constant_memory mode flushes each row's XML as soon as
+        the next row starts, and openpyxl's write_only workbook serializes
+        appended rows immediately. Rows must therefore be written in order.
+        """
+        cell = ExcelService._cell
+        if engine == "openpyxl":
+            if not OPENPYXL_HAS_LXML:
+                logging.warning("lxml not installed; openpyxl write_only export falls back to the slower stdlib XML writer")
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("BRSR")
+            ws.append(list(header))
+            for row in rows:
+                ws.append([cell(v) for v in row])
+            wb.save(buf)
+            return
+        if engine != "xlsxwriter":
+            raise ValueError(f"Unsupported Excel engine: {engine}")
+
+        wb = xlsxwriter.Workbook(buf, {
+            "constant_memory": True,
+            "strings_to_numbers": False,
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        })
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, header)
+        for i, row in enumerate(rows, 1):
+            ws.write_row(i, 0, [cell(v) for v in row])
+        wb.close()
+
+    @staticmethod
+    def dataframe_to_excel_bytes(df: pd.DataFrame, engine: str = "xlsxwriter") -> bytes:
+        """Return Excel file bytes for streaming to clients."""
         buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine=engine) as writer:
-            df.to_excel(writer, index=False)
-        buf.seek(0)
-        return buf.read()
+        ExcelService.write_xlsx(buf, df.columns.tolist(), df.itertuples(index=False, name=None), engine=engine)
+        return buf.getvalue()
 
     @staticmethod
     def json_to_excel_bytes(json_paths: List[str]) -> bytes:
-        df = ExcelService.json_paths_to_dataframe(json_paths)
-        return ExcelService.dataframe_to_excel_bytes(df)
+        docs = ExcelService.load_json_many(json_paths)
+        buf = io.BytesIO()
+        ExcelService.write_xlsx(buf, COLUMNS, ExcelService.iter_rows(docs))
+        return buf.getvalue()
 
     @staticmethod
     def json_to_excel_file(json_paths: List[str], output_file: str = "brsr_output.xlsx") -> None:
         """Convenience: write Excel to disk (if you still want that)."""
-        df = ExcelService.json_paths_to_dataframe(json_paths)
-        df.to_excel(output_file, index=False)
+        docs = ExcelService.load_json_many(json_paths)
+        ExcelService.write_xlsx(output_file, COLUMNS, ExcelService.iter_rows(docs))
 
     @staticmethod
     def generate_excel(json_docs: List[Dict[str, Any]]):
@@ -351,20 +410,31 @@ class ExcelService:
         This accepts already-parsed JSON objects (extracted_json) rather than file paths.
         Returns an `io.BytesIO` positioned at start suitable for StreamingResponse.
         """
-        all_rows: List[Dict[str, Any]] = []
-        for data in json_docs:
-            base = ExcelService.build_base_row(data)
-            expanded = ExcelService.expand_all(data, base)
-            all_rows.extend(expanded)
-
-        df = pd.DataFrame(all_rows)
         buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False)
+        ExcelService.write_xlsx(buf, COLUMNS, ExcelService.iter_rows(json_docs))
         buf.seek(0)
         return buf
 
 
+@functools.lru_cache(maxsize=256)
+def _load_json_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    # mtime_ns and size are part of the key only, so an edited file misses.
+    return ExcelService.load_json(path)
+
+
+# Fixed sheet header: every base-row column (derived from the row builder so
+# the two can't drift apart), then the material-issue columns from expand_all.
+RISK_COLUMNS = (
+    "26. Category",
+    "26. Material Issue",
+    "26. Risk/Opportunity",
+    "26. Rationale",
+    "26. Financial Impact",
+    "26. Approach to Adapt/Mitigate",
+)
+COLUMNS = tuple(ExcelService.build_base_row({})) + RISK_COLUMNS
+
+
 def json_to_excel(json_paths: List[str], output_file: str = "brsr_output.xlsx"):
     # backward-compatible function
     ExcelService.json_to_excel_file(json_paths, output_file)
@@ -388,7 +458,7 @@ def upload_excel_to_supabase(
     make_public: bool = True,
     expires_in: int = 60 * 60 * 24,
 ) -> str:
-    """Generate Excel bytes from `json_paths`, upload to Supabase Storage and
+    """Generate an Excel workbook from `json_paths`, upload to Supabase Storage and
     return a public URL (or signed URL).
 
     Parameters:
@@ -401,9 +471,6 @@ def upload_excel_to_supabase(
 
     Returns: URL string
     """
-    # build excel bytes
-    excel_bytes = ExcelService.json_to_excel_bytes(json_paths)
-
     # import client here to avoid mandatory dependency unless used
     try:
         from supabase import create_client
@@ -412,16 +479,26 @@ def upload_excel_to_supabase(
 
     supabase = create_client(supabase_url, supabase_key)
 
-    # upload expects a file-like or bytes object
+    # Build the workbook on disk and hand the client an open file, so the
+    # upload never holds the whole workbook in memory. (The storage client
+    # takes bytes, a path or a real file object, not a BytesIO.)
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
     try:
-        res = supabase.storage.from_(bucket).upload(dest_path, io.BytesIO(excel_bytes))
-    except Exception:
-        # Attempt to remove existing object and re-upload (common when file exists)
+        ExcelService.json_to_excel_file(json_paths, tmp_path)
         try:
-            supabase.storage.from_(bucket).remove([dest_path])
+            with open(tmp_path, "rb") as f:
+                res = supabase.storage.from_(bucket).upload(dest_path, f)
         except Exception:
-            pass
-        res = supabase.storage.from_(bucket).upload(dest_path, io.BytesIO(excel_bytes))
+            # Attempt to remove existing object and re-upload (common when file exists)
+            try:
+                supabase.storage.from_(bucket).remove([dest_path])
+            except Exception:
+                pass
+            with open(tmp_path, "rb") as f:
+                res = supabase.storage.from_(bucket).upload(dest_path, f)
+    finally:
+        os.remove(tmp_path)
 
     if make_public:
         try:
@@ -1,12 +1,33 @@
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Optional, Type, Union
 import re
 import asyncio
 import logging
+import time
+import orjson
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
 from ..config import settings
 
+# Gemini rejects explicit context caches smaller than this many tokens.
+_MIN_CACHE_TOKENS = 1024
+# Re-create the prompt cache this long before it expires.
+_CACHE_REFRESH_AHEAD_SECONDS = 300
+# Markdown code fences (```json ... ```) around an otherwise-JSON response.
+_FENCE_RE = re.compile(r"```(?:json)?\s*", re.IGNORECASE)
+# Transient failures worth retrying: HTTP status codes, then error phrases.
+_RETRY_CODES_RE = re.compile(r"\b(?:429|500|503)\b")
+_RETRY_PHRASES = (
+    "winerror 10054",
+    "forcibly closed by the remote host",
+    "connection reset",
+    "timed out",
+    "timeout",
+    "temporarily unavailable",
+    "service unavailable",
+    "too many requests",
+)
+
 
 class GeminiService:
 
@@ -18,32 +39,126 @@ class GeminiService:
         self.model_name = "gemini-2.5-flash"
         self.max_attempts = 3
         self.base_backoff_seconds = 1.5
-
-    async def extract_section_a(self, file_bytes: bytes, prompt: str) -> Dict[str, Any]:
+        # Token counts of static prompts, keyed by prompt text; see count_prompt_tokens.
+        self._prompt_tokens: Dict[str, int] = {}
+        # Server-side context cache for one static prompt; see refresh_prompt_cache.
+        self._cache_prompt: Optional[str] = None
+        self._cache_name: Optional[str] = None
+        self._cache_expires_at = 0.0
+        self._cache_lock = asyncio.Lock()
+
+    @staticmethod
+    def prompt_part(prompt: str) -> types.Part:
+        """Wrap a static prompt in a Part once so callers can reuse it per request."""
+        return types.Part.from_text(text=prompt)
+
+    async def count_prompt_tokens(self, prompt: str) -> Optional[int]:
+        """Count a static prompt's tokens once per process; None if the API call fails."""
+        if prompt not in self._prompt_tokens:
+            try:
+                result = await self.client.aio.models.count_tokens(model=self.model_name, contents=prompt)
+            except Exception:
+                logging.exception("Failed to count prompt tokens")
+                return None
+            self._prompt_tokens[prompt] = result.total_tokens
+        return self._prompt_tokens[prompt]
+
+    async def refresh_prompt_cache(self, prompt: str, force: bool = False) -> Optional[str]:
+        """
+        Return the name of a Gemini context cache holding `prompt`, creating
+        or re-creating it when missing, near expiry, or `force` is set.
+        Returns None when caching is disabled, the prompt is too small to
+        cache, or creation fails; callers then send the prompt inline.
+        """
+        if not settings.GEMINI_CONTEXT_CACHE:
+            return None
+        async with self._cache_lock:
+            fresh = time.monotonic() < self._cache_expires_at - _CACHE_REFRESH_AHEAD_SECONDS
+            if not force and fresh and self._cache_prompt == prompt:
+                return self._cache_name
+
+            tokens = await self.count_prompt_tokens(prompt)
+            if tokens is not None and tokens < _MIN_CACHE_TOKENS:
+                return None
+
+            previous = self._cache_name
+            try:
+                cache = await self.client.aio.caches.create(
+                    model=self.model_name,
+                    config=types.CreateCachedContentConfig(
+                        contents=[prompt],
+                        ttl=f"{settings.GEMINI_CACHE_TTL_SECONDS}s",
+                        display_name="brsr-section-a-prompt",
+                    ),
+                )
+            except Exception:
+                logging.exception("Failed to create Gemini context cache")
+                self._cache_name = None
+                self._cache_expires_at = 0.0
+                return None
+
+            self._cache_prompt = prompt
+            self._cache_name = cache.name
+            self._cache_expires_at = time.monotonic() + settings.GEMINI_CACHE_TTL_SECONDS
+            if previous and previous != cache.name:
+                # Cached storage is billed until expiry; drop the superseded copy.
+                try:
+                    await self.client.aio.caches.delete(name=previous)
+                except Exception:
+                    logging.warning("Failed to delete superseded Gemini cache %s", previous)
+            return self._cache_name
+
+    async def keep_prompt_cache_warm(self, prompt: str) -> None:
+        """Background loop that re-creates the prompt cache shortly before it expires."""
+        while True:
+            await self.refresh_prompt_cache(prompt)
+            remaining = self._cache_expires_at - _CACHE_REFRESH_AHEAD_SECONDS - time.monotonic()
+            await asyncio.sleep(max(remaining, 60))
+
+    async def extract_section_a(
+        self,
+        file_bytes: bytes,
+        prompt: Union[str, types.Part],
+        cached_prompt: Optional[str] = None,
+        response_schema: Optional[Type[BaseModel]] = None,
+    ) -> Dict[str, Any]:
         """
-        Accepts raw PDF bytes + prompt.
+        Accepts raw PDF bytes + prompt (text or a prebuilt Part).
+        When `cached_prompt` (the prompt's text) is given, the prompt is
+        served from a Gemini context cache and only the PDF is sent.
+        `response_schema` constrains the output to that model's JSON shape.
         Returns cleaned JSON.
         """
 
         if not file_bytes:
             raise ValueError("Empty PDF bytes provided")
 
+        # Built once and reused across retry attempts.
+        pdf_part = types.Part.from_bytes(
+            data=file_bytes,
+            mime_type="application/pdf"
+        )
+        cache_name = await self.refresh_prompt_cache(cached_prompt) if cached_prompt else None
+        cache_recreated = False
         last_error: Exception | None = None
 
         for attempt in range(1, self.max_attempts + 1):
             try:
-                # SDK call is blocking; run it in a worker thread to avoid
-                # blocking the event loop used by FastAPI background work.
-                response = await asyncio.to_thread(
-                    self.client.models.generate_content,
+                config_kwargs: Dict[str, Any] = {}
+                if response_schema is not None:
+                    config_kwargs.update(response_mime_type="application/json", response_schema=response_schema)
+                if cache_name:
+                    contents = [pdf_part]
+                    config_kwargs["cached_content"] = cache_name
+                else:
+                    contents = [pdf_part, prompt]
+                config = types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
+                # Native async client: no worker-thread hop, and concurrent
+                # extractions aren't capped by the default executor size.
+                response = await self.client.aio.models.generate_content(
                     model=self.model_name,
-                    contents=[
-                        types.Part.from_bytes(
-                            data=file_bytes,
-                            mime_type="application/pdf"
-                        ),
-                        prompt
-                    ]
+                    contents=contents,
+                    config=config
                 )
 
                 if not response or not response.text:
@@ -52,13 +167,18 @@ class GeminiService:
                 # Match script flow:
                 # 1) parse JSON if possible
                 # 2) clean markdown-fenced raw responses
-                # 3) normalize stock_exchange_listing token(s)
+                # Listing/sector normalization runs afterwards in app.services.section_a.
                 parsed = self._parse_or_raw(response.text)
                 parsed = self._clean_gemini_response(parsed)
-                # parsed = self._normalize_stock_exchange_listing(parsed)
                 return parsed
             except Exception as e:
                 last_error = e
+                if cache_name and not cache_recreated and self._is_cache_not_found(e):
+                    # The cache expired or was evicted server-side: re-create it
+                    # once, falling back to the inline prompt if that fails.
+                    cache_recreated = True
+                    cache_name = await self.refresh_prompt_cache(cached_prompt, force=True)
+                    continue
                 if attempt >= self.max_attempts or not self._is_retryable_error(e):
                     break
                 backoff = self.base_backoff_seconds * (2 ** (attempt - 1))
@@ -80,7 +200,7 @@ class GeminiService:
     def _parse_or_raw(self, response_text: str) -> Dict[str, Any]:
         # Script-equivalent: try strict JSON parse first; fallback to raw text.
         try:
-            return json.loads(response_text)
+            return orjson.loads(response_text)
         except Exception:
             return {"raw_response": response_text}
 
@@ -91,96 +211,33 @@ class GeminiService:
         """
         if isinstance(result, dict) and "raw_response" in result:
             raw = str(result["raw_response"])
-            clean = re.sub(r'```(?:json)?\s*', '', raw, flags=re.IGNORECASE)
-            clean = re.sub(r'\s*```$', '', clean)
-            clean = clean.strip()
+            # Most fallbacks carry no markdown fence; skip the regex pass for those.
+            clean = (_FENCE_RE.sub("", raw) if "```" in raw else raw).strip()
             try:
-                return json.loads(clean)
-            except json.JSONDecodeError:
+                return orjson.loads(clean)
+            except orjson.JSONDecodeError:
                 return {"raw_response": clean}
         return result
 
-    # def _normalize_stock_exchange_listing(self, result: Dict[str, Any]) -> Dict[str, Any]:
-    #     """
-    #     Script-equivalent normalization:
-    #     - only BSE -> BSE
-    #     - only NSE -> NSE
-    #     - both -> BSENSE
-    #     - keep any other exchanges as uppercase tokens after the above.
-    #     """
-    #     if not isinstance(result, dict):
-    #         return result
-
-    #     ent = result.get("entity_details")
-    #     if not isinstance(ent, dict):
-    #         return result
-
-    #     val = ent.get("stock_exchange_listing")
-    #     if val is None:
-    #         return result
-
-    #     if isinstance(val, list):
-    #         raw = " ".join(str(x) for x in val)
-    #     elif isinstance(val, dict):
-    #         raw = " ".join(str(v) for v in val.values())
-    #     else:
-    #         raw = str(val)
-
-    #     s = raw.strip()
-    #     if s == "":
-    #         ent["stock_exchange_listing"] = ""
-    #         result["entity_details"] = ent
-    #         return result
-
-    #     lowered = s.lower()
-    #     bse_present = bool(re.search(r"\bbse\b", lowered) or "bombay" in lowered)
-    #     nse_present = bool(re.search(r"\bnse\b", lowered) or "national stock exchange" in lowered)
-
-    #     cleaned = lowered
-    #     cleaned = re.sub(r"bombay stock exchange", "", cleaned)
-    #     cleaned = re.sub(r"\bbse\b", "", cleaned)
-    #     cleaned = re.sub(r"national stock exchange", "", cleaned)
-    #     cleaned = re.sub(r"\bnse\b", "", cleaned)
-
-    #     parts = re.split(r"[,;/\\\n]+|\s{2,}|\s", cleaned)
-    #     others = []
-    #     for p in parts:
-    #         token = p.strip()
-    #         if not token:
-    #             continue
-    #         token_up = token.upper()
-    #         if token_up not in ("BSE", "NSE") and token_up not in others:
-    #             others.append(token_up)
-
-    #     result_tokens = []
-    #     if bse_present and nse_present:
-    #         result_tokens.append("BSENSE")
-    #     elif bse_present:
-    #         result_tokens.append("BSE")
-    #     elif nse_present:
-    #         result_tokens.append("NSE")
-
-    #     for o in others:
-    #         if o and o not in result_tokens:
-    #             result_tokens.append(o)
-
-    #     ent["stock_exchange_listing"] = " ".join(result_tokens)
-    #     result["entity_details"] = ent
-    #     return result
+    def _is_cache_not_found(self, err: Exception) -> bool:
+        msg = str(err).lower()
+        return "cachedcontent" in msg or "cached content" in msg or ("cache" in msg and "not found" in msg)
 
     def _is_retryable_error(self, err: Exception) -> bool:
         msg = str(err).lower()
-        retry_markers = [
-            "winerror 10054",
-            "forcibly closed by the remote host",
-            "connection reset",
-            "timed out",
-            "timeout",
-            "temporarily unavailable",
-            "service unavailable",
-            "too many requests",
-            "429",
-            "503",
-            "500",
-        ]
-        return any(marker in msg for marker in retry_markers)
+        return bool(_RETRY_CODES_RE.search(msg)) or any(phrase in msg for phrase in _RETRY_PHRASES)
+
+
+_service: Optional[GeminiService] = None
+
+
+def get_gemini_service() -> GeminiService:
+    """Lazily create and return the process-wide GeminiService.
+
+    Deferring construction keeps imports working when GEMINI_API_KEY is not
+    set; the app lifespan calls this at startup to warm the client.
+    """
+    global _service
+    if _service is None:
+        _service = GeminiService()
+    return _service
@@ -1,59 +1,76 @@
+"""Task-queue worker for Gemini extractions.
+
+When REDIS_URL is set, `/documents/upload` enqueues one job per new PDF
+instead of running the extraction inside the web process, so extractions
+survive web restarts and scale with the number of workers. Start a worker
+with:
+
+    arq app.services.processing.WorkerSettings
+"""
+import asyncio
 import logging
-from datetime import datetime
-from bson import ObjectId
-from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
 
+from ..bson_compat import ObjectId
 from ..config import settings
-from .gemini_service import GeminiService
-from . import storage_service
-
-
-def process_document_job(document_id: str, file_url: str, prompt: str, user_id: str = None):
-    """Worker job: download file from Supabase, call Gemini to extract JSON,
-    and update MongoDB document record.
-
-    This function is synchronous so it can be run by RQ workers.
-    """
-    try:
-        # download file bytes from Supabase using the existing client
-        try:
-            # storage_service.supabase is the client created in storage_service
-            path = file_url.split(f"/{storage_service.BUCKET_NAME}/")[1]
-        except Exception:
-            logging.exception("Invalid file URL: %s", file_url)
-            path = None
-
-        if not path:
-            # update the db with failed status
-            _update_doc(document_id, {"status": "failed", "error": "invalid_file_url", "parsed_at": datetime.utcnow()})
-            return
-
-        file_bytes = storage_service.supabase.storage.from_(storage_service.BUCKET_NAME).download(path)
-
-        # call the existing async method synchronously
-        try:
-            import asyncio
-
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            parsed = loop.run_until_complete(GeminiService().extract_section_a(file_bytes, prompt))
-        except Exception as exc:
-            logging.exception("Extraction failed: %s", exc)
-            _update_doc(document_id, {"status": "failed", "error": str(exc), "parsed_at": datetime.utcnow()})
-            return
-    except Exception as exc:
-        logging.exception("Unexpected error processing document %s: %s", document_id, exc)
-        _update_doc(document_id, {"status": "failed", "error": "unexpected_error", "parsed_at": datetime.utcnow()})
-        return
-    # Update MongoDB synchronously using pymongo
-    _update_doc(document_id, {"status": "completed", "extracted_json": parsed, "parsed_at": datetime.utcnow()})
-
-
-def _update_doc(document_id: str, update: dict):
-    try:
-        mc = MongoClient(settings.MONGO_URI)
-        db = mc[settings.MONGO_DB]
-        coll = db["documents"]
-        coll.update_one({"_id": ObjectId(document_id)}, {"$set": update})
-    except Exception:
-        logging.exception("Failed to update document %s", document_id)
+from ..database import close_client
+from ..http_client import close_http_client
+from .storage_service import StorageService
+
+_pool: Optional[ArqRedis] = None
+
+
+async def get_queue() -> ArqRedis:
+    """Lazily create and return the shared Redis pool used to enqueue jobs."""
+    global _pool
+    if _pool is None:
+        _pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    return _pool
+
+
+async def close_queue() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def enqueue_extraction(document_id: str, file_url: str) -> None:
+    # The job id makes a re-enqueue of the same document a no-op while it is queued.
+    queue = await get_queue()
+    await queue.enqueue_job("process_document_job", document_id, file_url, _job_id=f"extract:{document_id}")
+
+
+async def process_document_job(ctx, document_id: str, file_url: str) -> None:
+    """Worker job: download the PDF from Supabase, extract it via Gemini and
+    update the MongoDB document record."""
+    # Imported here: the upload route imports this module to enqueue jobs.
+    from ..routes.upload import process_document
+
+    logging.info("Processing document %s (attempt %s)", document_id, ctx.get("job_try"))
+    await process_document(ObjectId(document_id), lambda: StorageService.download_file(file_url))
+
+
+async def _startup(ctx) -> None:
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.THREAD_POOL_WORKERS, thread_name_prefix="io")
+    )
+
+
+async def _shutdown(ctx) -> None:
+    close_client()
+    await close_http_client()
+
+
+class WorkerSettings:
+    functions = [process_document_job]
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL or "redis://localhost:6379")
+    # Gemini calls per worker process; run more workers to scale out.
+    max_jobs = settings.GEMINI_MAX_CONCURRENCY
+    job_timeout = settings.EXTRACTION_JOB_TIMEOUT_SECONDS
+    on_startup = _startup
+    on_shutdown = _shutdown
@@ -0,0 +1,101 @@
+"""Deterministic post-processing of Section A extractions."""
+import re
+from typing import Any, Dict, Tuple, Type, get_args, get_origin
+
+from pydantic import BaseModel
+
+from ..models import SECTORS, SectionAResponse
+
+_BSE_RE = re.compile(r"\bbse\b|\bbombay stock exchange\b", re.IGNORECASE)
+_NSE_RE = re.compile(r"\bnse\b|\bnational stock exchange\b", re.IGNORECASE)
+_LISTING_SPLIT_RE = re.compile(r"\s*[;,\n]\s*")
+# A BSE/NSE mention with its "The ..." / "... of India Limited" trimmings; other
+# exchanges sharing an item with one are whatever is left around these matches.
+_BSE_NSE_MENTION_RE = re.compile(
+    rf"(?:\bthe\s+)?(?:{_BSE_RE.pattern}|{_NSE_RE.pattern})(?:\s+(?:of\s+india|limited|ltd)\b\.?)*",
+    re.IGNORECASE,
+)
+# Connectors left at the edges of such a remainder, e.g. "NSE and London Stock Exchange".
+_LISTING_CONNECTOR_RE = re.compile(
+    r"^(?:\s|&|/|\band\b|\blisted\s+(?:on|with|at)\b)+|(?:\s|&|/|\band\b)+$", re.IGNORECASE
+)
+# Values passed through as-is: not listed / not mentioned.
+_LISTING_SENTINELS = {"none", "n/a"}
+
+_SECTOR_BY_LOWER = {s.lower(): s for s in SECTORS}
+
+# Top-level keys that are not disclosures and so don't count towards the score.
+_UNSCORED_FIELDS = {"section", "confidence_score"}
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _is_filled(value: Any) -> bool:
+    return value is not None and value != ""
+
+
+def _score(model: Type[BaseModel], data: Any, top_level: bool = False) -> Tuple[int, int]:
+    """Return (filled, total) leaf counts of `data` against `model`'s fields."""
+    data = data if isinstance(data, dict) else {}
+    filled = total = 0
+    for name, field in model.model_fields.items():
+        if top_level and name in _UNSCORED_FIELDS:
+            continue
+        annotation = field.annotation
+        value = data.get(name)
+        if _is_model(annotation):
+            sub_filled, sub_total = _score(annotation, value)
+            filled += sub_filled
+            total += sub_total
+        elif get_origin(annotation) is list:
+            # A table counts as one field, filled if any row has a value.
+            (row_model,) = get_args(annotation)
+            rows = value if isinstance(value, list) else []
+            total += 1
+            filled += any(_score(row_model, row)[0] for row in rows)
+        else:
+            total += 1
+            filled += _is_filled(value)
+    return filled, total
+
+
+TOTAL_FIELDS = _score(SectionAResponse, {}, top_level=True)[1]
+
+
+def compute_confidence(parsed: Dict[str, Any]) -> int:
+    """Percentage of Section A fields that came back with a value."""
+    filled, _ = _score(SectionAResponse, parsed, top_level=True)
+    return round(filled / TOTAL_FIELDS * 100)
+
+
+def normalize_stock_exchange_listing(value: Any) -> Any:
+    """Canonical listing string: "BSE", then "NSE", then any other exchanges as written."""
+    if isinstance(value, list):
+        value = "; ".join(str(v) for v in value)
+    if not isinstance(value, str) or not value.strip() or value.strip().lower() in _LISTING_SENTINELS:
+        return value
+
+    bse = nse = False
+    others = []
+    for item in _LISTING_SPLIT_RE.split(value):
+        bse = bse or bool(_BSE_RE.search(item))
+        nse = nse or bool(_NSE_RE.search(item))
+        # Split only at BSE/NSE mentions, so names like "X Exchange and Clearing" stay whole.
+        for rest in _BSE_NSE_MENTION_RE.split(item):
+            rest = _LISTING_CONNECTOR_RE.sub("", rest)
+            if rest and rest not in others:
+                others.append(rest)
+    return " ".join((["BSE"] if bse else []) + (["NSE"] if nse else []) + others)
+
+
+def normalize_section_a(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the listing and sector normalization rules in place."""
+    entity = parsed.get("entity_details")
+    if isinstance(entity, dict):
+        entity["stock_exchange_listing"] = normalize_stock_exchange_listing(entity.get("stock_exchange_listing"))
+        sector = entity.get("sector")
+        if isinstance(sector, str):
+            entity["sector"] = _SECTOR_BY_LOWER.get(sector.strip().lower(), sector)
+    return parsed
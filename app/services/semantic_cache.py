@@ -0,0 +1,166 @@
+"""Near-duplicate cache for Section A extractions.
+
+BRSR reports from the same issuer are structurally near-identical year to
+year. This cache embeds a short text fingerprint of a PDF's first pages and,
+when a previous extraction is similar enough, lets the caller ask Gemini for
+a small RFC 6902 JSON Patch against that extraction instead of re-running
+the full prompt.
+
+Disabled unless SEMANTIC_CACHE_ENABLED is set. It needs the optional
+packages `pdfplumber`, `sentence-transformers` and `jsonpatch`, which are
+imported lazily so the service runs without them.
+"""
+import asyncio
+import copy
+import io
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..database import get_db
+
+_WS_RE = re.compile(r"\s+")
+
+_model = None
+_model_lock = asyncio.Lock()
+_index_lock = asyncio.Lock()
+# In-process copy of the newest SEMANTIC_CACHE_MAX_ENTRIES cache entries,
+# oldest first: a row-normalized embedding matrix and the matching extractions.
+# Loaded on first lookup, appended on store.
+_matrix: Optional[np.ndarray] = None
+_payloads: List[Dict[str, Any]] = []
+
+DIFF_PROMPT_TEMPLATE = """
+You are a regulatory document extraction engine.
+
+You are given a full PDF of a SEBI Business Responsibility and Sustainability Report (BRSR)
+and the SECTION A – GENERAL DISCLOSURES JSON previously extracted from a structurally
+similar report (typically the same company in another year).
+
+Compare the PDF against the JSON below and output ONLY a JSON array of RFC 6902 JSON Patch
+operations ("replace", "add", "remove") that turn it into the correct extraction for this PDF.
+
+Rules:
+1. Extract values exactly as written in the PDF; do not summarize, infer or calculate.
+2. Keep every key name and the nesting exactly as in the JSON below; do not add or remove keys
+   except for items of arrays.
+3. Check every value, especially financial_year, employee/worker counts, turnover rates,
+   CSR figures, grievances and holding/subsidiary rows, which usually change between years.
+4. If nothing differs, output [].
+5. Output ONLY valid JSON.
+
+PREVIOUS EXTRACTION:
+{cached_json}
+"""
+
+
+def _fingerprint(file_bytes: bytes) -> Optional[str]:
+    """Canonicalized text of the first pages (CIN, entity name, Section A headings)."""
+    try:
+        import pdfplumber
+    except Exception as e:
+        raise RuntimeError("pdfplumber is required for the semantic cache: pip install pdfplumber") from e
+
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        text = " ".join((page.extract_text() or "") for page in pdf.pages[: settings.SEMANTIC_CACHE_PAGES])
+    text = _WS_RE.sub(" ", text).strip().lower()
+    return text[: settings.SEMANTIC_CACHE_FINGERPRINT_CHARS] or None
+
+
+async def _get_model():
+    global _model
+    async with _model_lock:
+        if _model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except Exception as e:
+                raise RuntimeError(
+                    "sentence-transformers is required for the semantic cache: pip install sentence-transformers"
+                ) from e
+            _model = await asyncio.to_thread(SentenceTransformer, settings.SEMANTIC_CACHE_MODEL)
+    return _model
+
+
+async def _embed(file_bytes: bytes) -> Optional[np.ndarray]:
+    text = await asyncio.to_thread(_fingerprint, file_bytes)
+    if not text:
+        return None
+    model = await _get_model()
+    vec = await asyncio.to_thread(model.encode, text, normalize_embeddings=True)
+    return np.asarray(vec, dtype=np.float32)
+
+
+def _collection():
+    return get_db()["semantic_cache"]
+
+
+async def _load_index(dim: int) -> None:
+    global _matrix, _payloads
+    async with _index_lock:
+        if _matrix is not None and _matrix.shape[1] == dim:
+            return
+        # Entries embedded by another SEMANTIC_CACHE_MODEL have a different
+        # dimension and can't be compared; leave them out.
+        docs = await _collection().find(
+            {"embedding": {"$size": dim}}, {"embedding": 1, "extracted_json": 1}
+        ).sort("created_at", -1).to_list(length=settings.SEMANTIC_CACHE_MAX_ENTRIES)
+        docs.reverse()
+        _payloads = [d["extracted_json"] for d in docs]
+        _matrix = np.asarray([d["embedding"] for d in docs], dtype=np.float32).reshape(len(docs), dim)
+
+
+async def lookup(file_bytes: bytes) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+    """Return (closest cached extraction or None, this PDF's embedding or None)."""
+    embedding = await _embed(file_bytes)
+    if embedding is None:
+        return None, None
+    await _load_index(embedding.shape[0])
+    if not len(_payloads):
+        return None, embedding
+
+    # Embeddings are unit-normalized, so the dot product is the cosine similarity.
+    scores = _matrix @ embedding
+    best = int(np.argmax(scores))
+    if float(scores[best]) < settings.SEMANTIC_CACHE_THRESHOLD:
+        return None, embedding
+    logging.info("Semantic cache hit (cosine %.3f)", float(scores[best]))
+    return _payloads[best], embedding
+
+
+async def store(embedding: np.ndarray, extracted_json: Dict[str, Any]) -> None:
+    global _matrix, _payloads
+    # The caller keeps normalizing and scoring its dict after this returns;
+    # cache a private copy so later lookups see the extraction as stored.
+    extracted_json = copy.deepcopy(extracted_json)
+    await _collection().insert_one({
+        "embedding": embedding.tolist(),
+        "extracted_json": extracted_json,
+        "created_at": datetime.now(timezone.utc),
+    })
+    async with _index_lock:
+        if _matrix is None or _matrix.shape[1] != embedding.shape[0]:
+            return
+        # Drop the oldest rows so the index, and each lookup's matmul, stay bounded.
+        cap = settings.SEMANTIC_CACHE_MAX_ENTRIES
+        _matrix = np.vstack([_matrix, embedding[None, :]])[-cap:]
+        _payloads = (_payloads + [extracted_json])[-cap:]
+
+
+def build_diff_prompt(cached_json: Dict[str, Any]) -> str:
+    return DIFF_PROMPT_TEMPLATE.format(cached_json=json.dumps(cached_json, ensure_ascii=False, indent=1))
+
+
+def apply_patch(cached_json: Dict[str, Any], ops: Any) -> Dict[str, Any]:
+    try:
+        import jsonpatch
+    except Exception as e:
+        raise RuntimeError("jsonpatch is required for the semantic cache: pip install jsonpatch") from e
+
+    if not isinstance(ops, list):
+        raise ValueError("Gemini did not return a JSON Patch array")
+    return jsonpatch.apply_patch(cached_json, ops, in_place=False)
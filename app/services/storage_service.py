@@ -1,18 +1,45 @@
-from supabase import create_client
+from cachetools import LRUCache
 from fastapi import HTTPException
 from ..config import settings
+from ..http_client import get_http_client
 import asyncio
-import time
+import hashlib
+import httpx
 import logging
-from typing import Optional
-
-supabase = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_SERVICE_ROLE_KEY
-)
+import mimetypes
+import os
+import random
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, TypeVar, Union
+from urllib.parse import quote
 
+# Supabase Storage is called through its REST API on the shared async HTTP
+# client, so uploads and downloads run on the event loop instead of holding
+# a worker thread each for the blocking supabase-py SDK.
 BUCKET_NAME = getattr(settings, "SUPABASE_BUCKET", "pdfs")
 
+_OBJECT_URL_PREFIX = f"{(settings.SUPABASE_URL or '').rstrip('/')}/storage/v1/object/{BUCKET_NAME}/"
+_PUBLIC_URL_PREFIX = f"{(settings.SUPABASE_URL or '').rstrip('/')}/storage/v1/object/public/{BUCKET_NAME}/"
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}",
+    "apikey": settings.SUPABASE_SERVICE_ROLE_KEY or "",
+}
+# PDFs can take a while to transfer; the shared client's default is 10s.
+_TRANSFER_TIMEOUT = httpx.Timeout(120, connect=10)
+_STREAM_CHUNK_SIZE = 1 << 20
+# Storage's ways of saying the object already exists.
+_DUPLICATE_RE = re.compile(r"already exists|duplicate|\b409\b", re.IGNORECASE)
+
+T = TypeVar("T")
+
+# (sha256 hex, name) -> public URL of recent uploads, so a retried request
+# for the same content skips the upload and its duplicate-error round-trip.
+_recent_uploads: LRUCache = LRUCache(maxsize=1024)
+
+# Caps concurrent Supabase uploads across the whole process, whether they come
+# from the upload route or from `upload_files` batches.
+upload_semaphore = asyncio.Semaphore(settings.STORAGE_MAX_CONCURRENCY)
+
 
 class DuplicateFileError(Exception):
     def __init__(self, file_name: str, public_url: Optional[str] = None):
@@ -21,90 +48,223 @@ class DuplicateFileError(Exception):
         super().__init__(f"File already exists in storage: {file_name}")
 
 
-def _extract_public_url(public_url_result):
-    if isinstance(public_url_result, dict):
-        return public_url_result.get("publicURL") or public_url_result.get("publicUrl")
-    return public_url_result
+class StorageError(Exception):
+    def __init__(self, status_code: int, body: str):
+        self.status_code = status_code
+        super().__init__(f"{status_code}: {body}")
 
 
-def _build_public_url(name: str) -> Optional[str]:
-    try:
-        return _extract_public_url(supabase.storage.from_(BUCKET_NAME).get_public_url(name))
-    except Exception:
-        return None
+def _build_public_url(name: str) -> str:
+    return _PUBLIC_URL_PREFIX + quote(name, safe="/")
 
 
 def _is_duplicate_error(exc: Exception) -> bool:
-    msg = str(exc).lower()
-    return (
-        "already exists" in msg
-        or "duplicate" in msg
-        or "resource already exists" in msg
-        or "the resource already exists" in msg
-        or "409" in msg
+    return _DUPLICATE_RE.search(str(exc)) is not None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, StorageError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    return isinstance(exc, httpx.TransportError)
+
+
+def _sha256_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(_STREAM_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def _iter_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as fh:
+        while chunk := await asyncio.to_thread(fh.read, _STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+async def _upload_once(name: str, data: Union[bytes, str]) -> None:
+    headers = {
+        **_AUTH_HEADERS,
+        "Content-Type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+        "x-upsert": "false",
+    }
+    if isinstance(data, (bytes, bytearray)):
+        content = data
+    else:
+        # A local path: stream the file instead of loading the whole PDF
+        # into memory. An explicit length avoids a chunked request.
+        headers["Content-Length"] = str(os.path.getsize(data))
+        content = _iter_file(data)
+
+    resp = await get_http_client().post(
+        _OBJECT_URL_PREFIX + quote(name, safe="/"),
+        content=content,
+        headers=headers,
+        timeout=_TRANSFER_TIMEOUT,
     )
+    if resp.is_error:
+        err = StorageError(resp.status_code, resp.text)
+        # Storage reports an existing object as 409, or as a 400 whose body
+        # carries statusCode "409" / "Duplicate".
+        if _is_duplicate_error(err):
+            raise DuplicateFileError(file_name=name, public_url=_build_public_url(name)) from err
+        raise err
 
 
-def _sync_upload_with_retries(name: str, file_bytes: bytes, attempts: int = 3, backoff: float = 1.0):
-    last_exc = None
-    for i in range(attempts):
-        try:
-            supabase.storage.from_(BUCKET_NAME).upload(name, file_bytes)
-            return _extract_public_url(supabase.storage.from_(BUCKET_NAME).get_public_url(name))
-        except Exception as exc:
-            if _is_duplicate_error(exc):
-                raise DuplicateFileError(file_name=name, public_url=_build_public_url(name)) from exc
-            last_exc = exc
-            logging.exception("Supabase upload attempt %s failed for %s", i + 1, name)
-            if i < attempts - 1:
-                time.sleep(backoff * (2 ** i))
-                continue
-            raise last_exc
+async def _exists(name: str) -> bool:
+    """HEAD the object; any failure just means "upload it"."""
+    try:
+        resp = await get_http_client().head(_OBJECT_URL_PREFIX + quote(name, safe="/"), headers=_AUTH_HEADERS)
+    except httpx.HTTPError:
+        logging.exception("Supabase existence check failed for %s", name)
+        return False
+    return resp.status_code == 200
 
 
-def _sync_download_with_retries(path: str, attempts: int = 3, backoff: float = 1.0):
-    last_exc = None
+async def _download_once(path: str) -> bytes:
+    resp = await get_http_client().get(
+        _OBJECT_URL_PREFIX + path,
+        headers=_AUTH_HEADERS,
+        timeout=_TRANSFER_TIMEOUT,
+    )
+    if resp.is_error:
+        raise StorageError(resp.status_code, resp.text)
+    return resp.content
+
+
+async def _with_retries(
+    call: Callable[[], Awaitable[T]],
+    action: str,
+    name: str,
+    attempts: int = 3,
+    backoff: float = 1.0,
+) -> T:
+    """Await `call()`, retrying transient failures with jittered exponential backoff."""
     for i in range(attempts):
         try:
-            return supabase.storage.from_(BUCKET_NAME).download(path)
+            return await call()
+        except DuplicateFileError:
+            raise
         except Exception as exc:
-            last_exc = exc
-            logging.exception("Supabase download attempt %s failed for %s", i + 1, path)
-            if i < attempts - 1:
-                time.sleep(backoff * (2 ** i))
+            logging.exception("Supabase %s attempt %s failed for %s", action, i + 1, name)
+            if i < attempts - 1 and _is_retryable(exc):
+                # Jitter keeps concurrent retries from hitting Storage in lockstep.
+                await asyncio.sleep(backoff * (2 ** i) + random.random() * 0.1)
                 continue
-            raise last_exc
+            raise
+
+
+async def _upload_with_retries(name: str, data: Union[bytes, str]) -> str:
+    await _with_retries(lambda: _upload_once(name, data), "upload", name)
+    return _build_public_url(name)
+
+
+async def _download_with_retries(path: str) -> bytes:
+    return await _with_retries(lambda: _download_once(path), "download", path)
 
 
 class StorageService:
 
     @staticmethod
-    async def upload_file(file_bytes: bytes = None, filename: str = None, file_path: str = None, **kwargs) -> str:
+    async def upload_file(
+        file_bytes: bytes = None,
+        filename: str = None,
+        file_path: str = None,
+        skip_if_exists: bool = False,
+        **kwargs,
+    ) -> str:
+        """Upload `file_bytes` and return its public URL.
+
+        Re-sending bytes this process already uploaded under the same name
+        (e.g. a client retry) returns the earlier URL without contacting Storage.
+        With `skip_if_exists`, an existing object is detected with a HEAD request
+        and its URL returned without uploading; worth the extra round-trip only
+        when duplicates are expected.
+        """
         # Accept either positional `filename` or `file_path` keyword for compatibility
         name = filename or file_path or kwargs.get("file_path")
         if not name or file_bytes is None:
             raise HTTPException(status_code=400, detail="Missing file bytes or filename/file_path for upload")
 
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(file_bytes).hexdigest())
+        key = (digest, name)
+        if key in _recent_uploads:
+            return _recent_uploads[key]
+
+        if skip_if_exists and await _exists(name):
+            return _build_public_url(name)
+
         try:
-            # run the blocking supabase upload in a threadpool and retry on transient failures
-            public_url = await asyncio.to_thread(_sync_upload_with_retries, name, file_bytes)
+            public_url = await _upload_with_retries(name, file_bytes)
         except DuplicateFileError:
             raise
         except Exception as exc:
             logging.exception("Failed to upload to Supabase: %s", exc)
             raise HTTPException(status_code=500, detail=f"Supabase storage error: {exc}")
 
+        _recent_uploads[key] = public_url
         return public_url
 
     @staticmethod
-    async def download_file(file_url: str) -> bytes:
+    async def upload_file_path(
+        local_path: str,
+        file_path: str,
+        skip_if_exists: bool = False,
+        file_hash: Optional[str] = None,
+    ) -> str:
+        """Upload a file from disk; same contract as `upload_file`.
+
+        Pass the file's SHA-256 hex digest as `file_hash` when the caller already
+        has it; otherwise the file is hashed here.
+        """
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(_sha256_file, local_path)
+        key = (file_hash, file_path)
+        if key in _recent_uploads:
+            return _recent_uploads[key]
+
+        if skip_if_exists and await _exists(file_path):
+            return _build_public_url(file_path)
         try:
-            path = file_url.split(f"/{BUCKET_NAME}/")[1]
-        except Exception:
+            public_url = await _upload_with_retries(file_path, local_path)
+        except DuplicateFileError:
+            raise
+        except Exception as exc:
+            logging.exception("Failed to upload to Supabase: %s", exc)
+            raise HTTPException(status_code=500, detail=f"Supabase storage error: {exc}")
+
+        _recent_uploads[key] = public_url
+        return public_url
+
+    @staticmethod
+    async def upload_files(files: List[Tuple[str, bytes]]) -> List[Union[str, BaseException]]:
+        """Upload several `(file_path, bytes)` pairs concurrently under `upload_semaphore`.
+
+        Returns one entry per input, in order: the public URL, or the exception
+        (`DuplicateFileError`, `HTTPException`) that upload raised.
+        """
+        async def _one(name: str, data: bytes) -> str:
+            async with upload_semaphore:
+                return await StorageService.upload_file(data, filename=name)
+
+        return await asyncio.gather(*[_one(name, data) for name, data in files], return_exceptions=True)
+
+    @staticmethod
+    async def download_file(file_url: str) -> bytes:
+        # Only URLs into our own bucket are accepted.
+        if file_url.startswith(_PUBLIC_URL_PREFIX):
+            path = file_url[len(_PUBLIC_URL_PREFIX):]
+        elif file_url.startswith(_OBJECT_URL_PREFIX):
+            path = file_url[len(_OBJECT_URL_PREFIX):]
+        else:
+            raise HTTPException(status_code=400, detail="Invalid file URL for download")
+        # Public URLs from the old SDK may end in a bare "?".
+        path = path.partition("?")[0]
+        if not path:
             raise HTTPException(status_code=400, detail="Invalid file URL for download")
 
         try:
-            data = await asyncio.to_thread(_sync_download_with_retries, path)
+            data = await _download_with_retries(path)
             return data
         except Exception as exc:
             logging.exception("Failed to download from Supabase: %s", exc)
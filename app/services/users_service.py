@@ -1,15 +1,62 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
 
 import jwt
+import orjson
+from cachetools import TTLCache
 from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError
 
 from ..config import get_settings
 from ..database import get_db
 from ..models import PyObjectId
 
 _settings = get_settings()
-_pwd_ctx = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Settings are fixed for the process lifetime; bind the token values once.
+_JWT_SECRET = _settings.local_jwt_secret
+_JWT_ALGORITHM = _settings.local_jwt_algorithm
+_JWT_EXP_MINUTES = _settings.local_jwt_exp_minutes
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# HMAC tokens are minted directly (static header, orjson payload, one hmac
+# call); other algorithms go through PyJWT.
+_JWT_DIGEST = _HMAC_DIGESTS.get(_JWT_ALGORITHM)
+_JWT_SECRET_BYTES = _JWT_SECRET.encode()
+_JWT_HEADER_B64 = _b64url(orjson.dumps({"alg": _JWT_ALGORITHM, "typ": "JWT"}))
+# argon2id (libargon2 via argon2-cffi) for new hashes; existing pbkdf2_sha256
+# hashes still verify and are upgraded on the next successful login.
+_pwd_ctx = CryptContext(
+    schemes=["argon2", "pbkdf2_sha256"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
+
+# Found user documents, briefly cached so a login (or a burst of them) doesn't
+# re-read the same record. Only hits are cached, so a new signup is visible
+# at once. Accessed only from the event loop between awaits; needs no lock.
+_USER_CACHE_TTL_SECONDS = 30
+# Fields the auth paths read; keeps the fetched (and cached) documents small.
+_USER_PROJECTION = {"_id": 1, "email": 1, "hashed_password": 1, "role": 1, "name": 1}
+_users_by_email: TTLCache = TTLCache(maxsize=4096, ttl=_USER_CACHE_TTL_SECONDS)
+_users_by_id: TTLCache = TTLCache(maxsize=4096, ttl=_USER_CACHE_TTL_SECONDS)
+
+
+def _cache_user(user: dict) -> None:
+    _users_by_email[user["email"]] = user
+    _users_by_id[str(user["_id"])] = user
 
 
 def _hash_password(password: str) -> str:
@@ -20,44 +67,80 @@ def _verify_password(password: str, hashed: str) -> bool:
     return _pwd_ctx.verify(password, hashed)
 
 
+async def warm_password_hashing() -> None:
+    """Load the hashing backends now (once per worker process, after any
+    fork) so the first login doesn't pay for it."""
+    await asyncio.to_thread(_hash_password, "warmup")
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify, returning a replacement hash if `hashed` uses a deprecated scheme."""
+    return _pwd_ctx.verify_and_update(password, hashed)
+
+
 async def get_user_by_email(email: str) -> Optional[dict]:
-    db = get_db()
-    return await db["users"].find_one({"email": email})
+    user = _users_by_email.get(email)
+    if user is None:
+        db = get_db()
+        user = await db["users"].find_one({"email": email}, _USER_PROJECTION)
+        if user is not None:
+            _cache_user(user)
+    return user
 
 
 async def get_user_by_id(user_id: str) -> Optional[dict]:
-    db = get_db()
-    return await db["users"].find_one({"_id": PyObjectId(user_id)})
+    user = _users_by_id.get(user_id)
+    if user is None:
+        db = get_db()
+        user = await db["users"].find_one({"_id": PyObjectId(user_id)}, _USER_PROJECTION)
+        if user is not None:
+            _cache_user(user)
+    return user
 
 
 async def create_user(email: str, password: str, name: Optional[str] = None) -> dict:
-    db = get_db()
-    existing = await db["users"].find_one({"email": email})
-    if existing:
+    if email in _users_by_email:
+        # Known without a round-trip; skip the hash.
         raise ValueError("User already exists")
-    hashed = _hash_password(password)
-    now = datetime.utcnow()
+    db = get_db()
+    # KDFs are CPU-bound by design; keep them off the event loop.
+    hashed = await asyncio.to_thread(_hash_password, password)
+    now = datetime.now(timezone.utc)
     user = {"email": email, "hashed_password": hashed, "name": name or "", "created_at": now, "role": "user"}
-    result = await db["users"].insert_one(user)
-    user["_id"] = result.inserted_id
+    try:
+        # Insert-if-absent in one round-trip: an existing email matches the
+        # filter and leaves the document untouched (no upserted_id). The unique
+        # email index (see database.ensure_indexes) settles concurrent signups.
+        result = await db["users"].update_one({"email": email}, {"$setOnInsert": user}, upsert=True)
+    except DuplicateKeyError:
+        raise ValueError("User already exists")
+    if result.upserted_id is None:
+        raise ValueError("User already exists")
+    user["_id"] = result.upserted_id
+    _cache_user(user)
     return user
 
 
 def create_access_token(data: dict, expires_minutes: Optional[int] = None) -> str:
-    secret = _settings.local_jwt_secret
-    if not secret:
+    if not _JWT_SECRET:
         raise RuntimeError("Local JWT secret not configured")
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=(expires_minutes or _settings.local_jwt_exp_minutes))
-    to_encode.update({"exp": expire})
-    token = jwt.encode(to_encode, secret, algorithm=_settings.local_jwt_algorithm)
-    return token
+    to_encode = {**data, "exp": int(time.time()) + 60 * (expires_minutes or _JWT_EXP_MINUTES)}
+    if _JWT_DIGEST is None:
+        return jwt.encode(to_encode, _JWT_SECRET, algorithm=_JWT_ALGORITHM)
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(to_encode))
+    signature = hmac.new(_JWT_SECRET_BYTES, signing_input, _JWT_DIGEST).digest()
+    return (signing_input + b"." + _b64url(signature)).decode()
 
 
 async def authenticate_user(email: str, password: str) -> Optional[dict]:
     user = await get_user_by_email(email)
     if not user:
         return None
-    if not _verify_password(password, user.get("hashed_password", "")):
+    valid, new_hash = await asyncio.to_thread(_verify_and_update, password, user.get("hashed_password", ""))
+    if not valid:
         return None
+    if new_hash:
+        db = get_db()
+        await db["users"].update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        user["hashed_password"] = new_hash
     return user
@@ -0,0 +1,78 @@
+import asyncio
+import types
+
+from app import auth
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FailingClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, url, timeout=None):
+        self.calls += 1
+        raise ConnectionError("JWKS endpoint unreachable")
+
+
+def _stale_cache(monkeypatch):
+    clock = _Clock()
+    client = _FailingClient()
+    monkeypatch.setattr(auth, "time", types.SimpleNamespace(monotonic=clock, time=lambda: clock.now))
+    monkeypatch.setattr(auth, "get_http_client", lambda: client)
+
+    cache = auth.JwksCache("https://example.invalid/auth/v1/keys")
+    cache.keys = {"keys": []}
+    cache.keys_by_kid = {"kid-1": object()}
+    # Well past the TTL, so every get() wants a refresh.
+    cache.fetched_at = clock.now - 10 * cache.ttl
+    return cache, clock, client
+
+
+def test_stale_keys_failing_fetch_is_attempted_once_per_interval(monkeypatch):
+    cache, clock, client = _stale_cache(monkeypatch)
+    stale = cache.keys_by_kid
+
+    async def burst():
+        return [await cache.get() for _ in range(20)]
+
+    results = asyncio.run(burst())
+    assert client.calls == 1
+    assert all(r is stale for r in results)
+
+    # Still inside the interval: no new fetch.
+    clock.now += auth._JWKS_MIN_REFRESH_INTERVAL - 1
+    asyncio.run(burst())
+    assert client.calls == 1
+
+    # Interval elapsed: exactly one more attempt, stale keys still served.
+    clock.now += 2
+    results = asyncio.run(burst())
+    assert client.calls == 2
+    assert all(r is stale for r in results)
+
+
+def test_no_keys_failing_fetch_is_throttled(monkeypatch):
+    cache, clock, client = _stale_cache(monkeypatch)
+    cache.keys = None
+    cache.keys_by_kid = {}
+
+    async def attempt():
+        try:
+            await cache.get()
+        except Exception:
+            pass
+
+    for _ in range(5):
+        asyncio.run(attempt())
+    assert client.calls == 1
+
+    clock.now += auth._JWKS_MIN_REFRESH_INTERVAL + 1
+    asyncio.run(attempt())
+    assert client.calls == 2
@@ -0,0 +1,39 @@
+from app.services.section_a import normalize_stock_exchange_listing
+
+
+def test_bse_and_nse_in_one_phrase():
+    assert normalize_stock_exchange_listing("BSE and NSE") == "BSE NSE"
+    assert normalize_stock_exchange_listing("National Stock Exchange and Bombay Stock Exchange") == "BSE NSE"
+
+
+def test_exchange_names_containing_and_are_kept_whole():
+    assert (
+        normalize_stock_exchange_listing("NSE; Calcutta Stock Exchange and Delhi Stock Exchange")
+        == "NSE Calcutta Stock Exchange and Delhi Stock Exchange"
+    )
+    assert (
+        normalize_stock_exchange_listing("BSE, Metropolitan Stock Exchange and Clearing Corporation")
+        == "BSE Metropolitan Stock Exchange and Clearing Corporation"
+    )
+
+
+def test_separators_and_sentinels():
+    assert normalize_stock_exchange_listing("NSE\nBSE") == "BSE NSE"
+    assert normalize_stock_exchange_listing(["BSE Limited", "Calcutta Stock Exchange"]) == "BSE Calcutta Stock Exchange"
+    assert normalize_stock_exchange_listing("None") == "None"
+
+
+def test_other_exchanges_sharing_an_item_with_bse_or_nse_are_kept():
+    assert normalize_stock_exchange_listing("BSE NSE NYSE") == "BSE NSE NYSE"
+    assert normalize_stock_exchange_listing("NSE and London Stock Exchange") == "NSE London Stock Exchange"
+    assert normalize_stock_exchange_listing("BSE Limited & London Stock Exchange") == "BSE London Stock Exchange"
+    assert normalize_stock_exchange_listing("Listed on BSE and NSE") == "BSE NSE"
+    assert (
+        normalize_stock_exchange_listing("National Stock Exchange of India Limited and NYSE and BSE Ltd.")
+        == "BSE NSE NYSE"
+    )
+
+
+def test_baseline_prompt_examples():
+    assert normalize_stock_exchange_listing("BSE, NSE and NYSE") == "BSE NSE NYSE"
+    assert normalize_stock_exchange_listing("NSE and London Stock Exchange") == "NSE London Stock Exchange"
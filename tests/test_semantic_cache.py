@@ -0,0 +1,83 @@
+import asyncio
+
+import numpy as np
+
+from app.services import semantic_cache
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        size = query["embedding"]["$size"]
+        return _Cursor([d for d in self.docs if len(d["embedding"]) == size])
+
+    async def insert_one(self, doc):
+        self.docs.append({**doc, "created_at": len(self.docs)})
+
+
+def _unit(dim, i):
+    vec = np.zeros(dim, dtype=np.float32)
+    vec[i % dim] = 1.0
+    return vec
+
+
+def _setup(monkeypatch, cap, embedding):
+    coll = _Collection()
+    monkeypatch.setattr(semantic_cache, "_collection", lambda: coll)
+    monkeypatch.setattr(semantic_cache, "_matrix", None)
+    monkeypatch.setattr(semantic_cache, "_payloads", [])
+    monkeypatch.setattr(semantic_cache.settings, "SEMANTIC_CACHE_MAX_ENTRIES", cap)
+    monkeypatch.setattr(semantic_cache.settings, "SEMANTIC_CACHE_THRESHOLD", 0.9)
+
+    async def fake_embed(file_bytes):
+        return embedding()
+
+    monkeypatch.setattr(semantic_cache, "_embed", fake_embed)
+    return coll
+
+
+def test_in_memory_index_is_capped_dropping_oldest(monkeypatch):
+    current = {"vec": _unit(8, 0)}
+    _setup(monkeypatch, cap=3, embedding=lambda: current["vec"])
+
+    async def run():
+        await semantic_cache.lookup(b"pdf")  # loads the (empty) index
+        for i in range(5):
+            await semantic_cache.store(_unit(8, i), {"n": i})
+        current["vec"] = _unit(8, 4)
+        newest, _ = await semantic_cache.lookup(b"pdf")
+        current["vec"] = _unit(8, 0)
+        evicted, _ = await semantic_cache.lookup(b"pdf")
+        return newest, evicted
+
+    newest, evicted = asyncio.run(run())
+    assert semantic_cache._matrix.shape == (3, 8)
+    assert [p["n"] for p in semantic_cache._payloads] == [2, 3, 4]
+    assert newest == {"n": 4}
+    assert evicted is None
+
+
+def test_entries_from_another_model_dimension_are_ignored(monkeypatch):
+    coll = _setup(monkeypatch, cap=10, embedding=lambda: _unit(4, 1))
+    coll.docs = [
+        {"embedding": _unit(8, 1).tolist(), "extracted_json": {"model": "old"}, "created_at": 0},
+        {"embedding": _unit(4, 1).tolist(), "extracted_json": {"model": "new"}, "created_at": 1},
+    ]
+
+    cached, embedding = asyncio.run(semantic_cache.lookup(b"pdf"))
+    assert cached == {"model": "new"}
+    assert embedding.shape == (4,)
@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.services import storage_service
+from app.services.storage_service import DuplicateFileError, StorageService
+
+
+def test_upload_files_keeps_order_and_isolates_failures(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_upload(name, data):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            # Later files finish first, so gather's ordering is what keeps results aligned.
+            await asyncio.sleep(0.01 * (5 - int(name[-5])))
+            if name == "batch-2.pdf":
+                raise DuplicateFileError(file_name=name)
+            if name == "batch-3.pdf":
+                raise RuntimeError("storage down")
+            return f"https://storage.invalid/{name}"
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(storage_service, "_upload_with_retries", fake_upload)
+    monkeypatch.setattr(storage_service, "upload_semaphore", asyncio.Semaphore(2))
+
+    files = [(f"batch-{i}.pdf", f"content {i}".encode()) for i in range(5)]
+    results = asyncio.run(StorageService.upload_files(files))
+
+    assert len(results) == 5
+    assert results[0] == "https://storage.invalid/batch-0.pdf"
+    assert results[1] == "https://storage.invalid/batch-1.pdf"
+    assert isinstance(results[2], DuplicateFileError)
+    assert isinstance(results[3], HTTPException) and results[3].status_code == 500
+    assert results[4] == "https://storage.invalid/batch-4.pdf"
+    assert peak == 2